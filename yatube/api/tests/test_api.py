@@ -0,0 +1,85 @@
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.author = User.objects.create_user(username='Author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for i in range(13):
+            Post.objects.create(
+                text=f'Пост {i}', author=cls.author, group=cls.group)
+        cls.post = Post.objects.order_by('pk').first()
+        Comment.objects.create(post=cls.post, author=cls.reader, text='Ок')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_feeds_are_paginated_by_cursor(self):
+        '''Ленты отдают по 10 постов и ссылку на следующую страницу.'''
+        urls = [
+            (reverse('api:index'), 1),
+            (reverse('api:group_list', kwargs={'slug': 'group'}), 2),
+            (reverse('api:profile', kwargs={'username': 'Author'}), 2),
+        ]
+        for url, queries in urls:
+            with self.subTest(url=url):
+                with self.assertNumQueries(queries):
+                    data = self.client.get(url).json()
+                self.assertEqual(len(data['results']), 10)
+                self.assertEqual(data['results'][0]['author'], 'Author')
+                self.assertEqual(data['results'][0]['group'], 'group')
+                rest = self.client.get(data['next']).json()
+                self.assertEqual(len(rest['results']), 3)
+                self.assertIsNone(rest['next'])
+
+    def test_post_detail_with_comments(self):
+        '''Пост отдаётся вместе с комментариями.'''
+        data = self.client.get(
+            reverse('api:post_detail', kwargs={'post_id': self.post.pk})
+        ).json()
+        self.assertEqual(data['text'], self.post.text)
+        self.assertEqual(data['comments_count'], 1)
+        self.assertEqual(data['comments'][0]['author'], 'Reader')
+
+    def test_follow_feed_needs_login(self):
+        '''Лента подписок доступна только авторизованным.'''
+        url = reverse('api:follow_index')
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.client.force_login(self.reader)
+        data = self.client.get(url).json()
+        self.assertEqual(len(data['results']), 10)
+
+    def test_feeds_have_no_comments_count(self):
+        '''Комментарии не меняют версий лент: их числа там нет.'''
+        data = self.client.get(reverse('api:index')).json()
+        self.assertNotIn('comments_count', data['results'][0])
+
+    def test_follow_feed_with_celebrities(self):
+        '''Посты «популярных» авторов подмешиваются, как и на сайте.'''
+        self.client.force_login(self.reader)
+        url = reverse('api:follow_index')
+        expected = self.client.get(url).json()['results']
+        with override_settings(FEED_FANOUT_LIMIT=0):
+            data = self.client.get(url).json()
+        self.assertEqual(data['results'], expected)
+        self.assertEqual(data['results'][0]['author'], 'Author')
+
+    def test_not_found_and_not_modified(self):
+        '''Отсутствующие объекты дают 404, неизменные страницы — 304.'''
+        missing = reverse('api:group_list', kwargs={'slug': 'missing'})
+        self.assertEqual(self.client.get(missing).status_code, 404)
+        url = reverse('api:index')
+        response = self.client.get(url)
+        not_modified = self.client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
@@ -0,0 +1,136 @@
+"""JSON API только для чтения: те же ленты, что и HTML-страницы.
+
+Строки берутся через ``.values()`` ровно с теми колонками, что уходят
+клиенту, без моделей, шаблонов и миниатюр. Страницы листаются курсором
+(``?cursor=``), а ``ETag``/``Last-Modified`` считаются по версиям
+областей кеша, как и у HTML-страниц.
+"""
+from django.conf import settings
+from django.http import JsonResponse
+from django.utils.http import urlencode
+
+from core.decorators import query_budget
+from posts import feed
+from posts.conditional import (POST_PAGE_SCOPES, conditional_page,
+                               post_scopes_lookup)
+from posts.models import Comment, Group, Post, User
+from posts.pagination import CursorPaginator
+
+PAGE_SIZE = 10
+COMMENTS_PAGE_SIZE = 50
+
+# Поле ответа: колонка в выборке постов. В лентах нет числа
+# комментариев: комментарий не меняет версий областей лент, и 304 отдавал
+# бы старое число.
+POST_VALUES = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+}
+POST_DETAIL_VALUES = {**POST_VALUES, 'comments_count': 'comments_count'}
+COMMENT_VALUES = {
+    'id': 'id',
+    'author': 'author__username',
+    'text': 'text',
+    'created': 'created',
+}
+
+
+def error(status, detail):
+    return JsonResponse({'detail': detail}, status=status)
+
+
+def serialize_post(row, values=POST_VALUES):
+    data = {field: row[column] for field, column in values.items()}
+    data['image'] = settings.MEDIA_URL + data['image'] if data['image'] \
+        else None
+    return data
+
+
+def post_values(queryset, values=POST_VALUES):
+    return queryset.values(*values.values())
+
+
+def cursor_link(request, cursor):
+    if cursor is None:
+        return None
+    return f'{request.path}?{urlencode({"cursor": cursor})}'
+
+
+def page_response(request, queryset, serialize, **options):
+    """Страница выборки со ссылками на соседние страницы."""
+    page = CursorPaginator(queryset, PAGE_SIZE, **options).get_page(
+        cursor=request.GET.get('cursor'))
+    return JsonResponse({
+        'results': [serialize(row) for row in page],
+        'next': cursor_link(request, page.next_cursor),
+        'previous': cursor_link(request, page.previous_cursor),
+    })
+
+
+@conditional_page('index')
+@query_budget(1)
+def index(request):
+    return page_response(
+        request, post_values(Post.objects.all()), serialize_post)
+
+
+@conditional_page('group:{slug}')
+@query_budget(2)
+def group_posts_list(request, slug):
+    if not Group.objects.filter(slug=slug).exists():
+        return error(404, 'Группа не найдена')
+    return page_response(
+        request, post_values(Post.objects.filter(group__slug=slug)),
+        serialize_post,
+    )
+
+
+@conditional_page('author:{username}')
+@query_budget(2)
+def profile(request, username):
+    author_id = (
+        User.objects.filter(username=username)
+        .values_list('pk', flat=True).first()
+    )
+    if author_id is None:
+        return error(404, 'Пользователь не найден')
+    return page_response(
+        request, post_values(Post.objects.filter(author_id=author_id)),
+        serialize_post,
+    )
+
+
+@conditional_page(*POST_PAGE_SCOPES, lookup=post_scopes_lookup)
+@query_budget(3)
+def post_detail(request, post_id):
+    '''Пост и первая страница его комментариев (дальше — ``?cursor=``).'''
+    row = post_values(
+        Post.objects.filter(pk=post_id), POST_DETAIL_VALUES).first()
+    if row is None:
+        return error(404, 'Пост не найден')
+    comments = Comment.objects.filter(post_id=post_id).values(
+        *COMMENT_VALUES.values())
+    page = CursorPaginator(
+        comments, COMMENTS_PAGE_SIZE, ordering=('created', 'id'),
+    ).get_page(cursor=request.GET.get('cursor'))
+    data = serialize_post(row, POST_DETAIL_VALUES)
+    data['comments'] = [
+        {field: comment[column] for field, column in COMMENT_VALUES.items()}
+        for comment in page
+    ]
+    data['comments_next'] = cursor_link(request, page.next_cursor)
+    return JsonResponse(data)
+
+
+@query_budget(5)
+def follow_index(request):
+    '''Лента подписок — та же выборка, что и на сайте.'''
+    if not request.user.is_authenticated:
+        return error(401, 'Нужна авторизация')
+    posts, options = feed.followed_posts(
+        request.user, values=POST_VALUES.values())
+    return page_response(request, posts, serialize_post, **options)
@@ -0,0 +1,137 @@
+"""Воспроизводимые наборы данных для нагрузочных тестов.
+
+Набор задаётся масштабом (числом постов) и зерном генератора: при одних
+и тех же параметрах получаются одни и те же пользователи, подписки и
+тексты. Популярность авторов распределена по закону Ципфа: немногие
+авторы пишут большую часть постов и собирают большую часть подписчиков,
+как на настоящем сайте. Записи пишутся через ``posts.importer``, так
+что счётчики, ленты и поисковый индекс сразу согласованы.
+"""
+import itertools
+import random
+from datetime import datetime, timedelta
+
+from django.db.models import Max
+from django.utils import timezone
+from faker import Faker
+
+from posts.importer import Importer
+from posts.models import Post
+
+SCALES = {
+    'tiny': 200,
+    '10k': 10_000,
+    '1m': 1_000_000,
+    '10m': 10_000_000,
+}
+POSTS_PER_USER = 50
+POSTS_PER_GROUP = 1000
+COMMENTS_PER_POST = 0.2
+MEAN_FOLLOWS = 20
+ZIPF_EXPONENT = 1.1
+# Посты набора укладываются в год до этой даты.
+LAST_PUB_DATE = datetime(2022, 6, 1, tzinfo=timezone.utc)
+
+
+def zipf_weights(count, exponent=ZIPF_EXPONENT):
+    """Накопленные веса рангов 1..count для ``random.choices``."""
+    return list(itertools.accumulate(
+        1 / rank ** exponent for rank in range(1, count + 1)))
+
+
+class Dataset:
+    """Генератор записей в формате ``import_yatube``."""
+
+    def __init__(self, posts, seed=0):
+        self.posts = posts
+        self.users = max(10, posts // POSTS_PER_USER)
+        self.groups = max(3, posts // POSTS_PER_GROUP)
+        self.random = random.Random(seed)
+        self.fake = Faker('ru_RU')
+        self.fake.seed_instance(seed)
+        self.prefix = f'bench{seed}'
+        self.weights = zipf_weights(self.users)
+
+    def username(self, index):
+        return f'{self.prefix}_{index}'
+
+    def popular_user(self):
+        """Пользователь, выбранный с весом его популярности."""
+        return self.random.choices(
+            range(self.users), cum_weights=self.weights)[0]
+
+    def records(self, first_post_id=1):
+        yield from self.group_records()
+        yield from self.user_records()
+        yield from self.follow_records()
+        yield from self.post_records(first_post_id)
+
+    def group_records(self):
+        for index in range(self.groups):
+            yield {
+                'type': 'group',
+                'slug': f'{self.prefix}-group-{index}',
+                'title': self.fake.catch_phrase(),
+                'description': self.fake.sentence(),
+            }
+
+    def user_records(self):
+        for index in range(self.users):
+            yield {
+                'type': 'user',
+                'username': self.username(index),
+                'first_name': self.fake.first_name(),
+                'last_name': self.fake.last_name(),
+            }
+
+    def follow_records(self):
+        for index in range(self.users):
+            count = min(
+                self.users - 1,
+                int(self.random.expovariate(1 / MEAN_FOLLOWS)),
+            )
+            authors = {self.popular_user() for _ in range(count)}
+            for author in authors - {index}:
+                yield {
+                    'type': 'follow',
+                    'user': self.username(index),
+                    'author': self.username(author),
+                }
+
+    def post_records(self, first_post_id):
+        start = LAST_PUB_DATE - timedelta(days=365)
+        step = timedelta(days=365) / self.posts
+        for index in range(self.posts):
+            post_id = first_post_id + index
+            group = self.random.randrange(self.groups * 2)
+            yield {
+                'type': 'post',
+                'id': post_id,
+                'text': self.fake.paragraph(nb_sentences=3),
+                'pub_date': (start + step * index).isoformat(),
+                'author': self.username(self.popular_user()),
+                'group': (
+                    f'{self.prefix}-group-{group}'
+                    if group < self.groups else None),
+            }
+            while self.random.random() < COMMENTS_PER_POST:
+                yield {
+                    'type': 'comment',
+                    'post': post_id,
+                    'author': self.username(self.popular_user()),
+                    'text': self.fake.sentence(),
+                }
+
+
+def seed(posts, seed=0, batch_size=500, progress=None):
+    """Записать набор в базу; возвращает счётчики ``Importer``."""
+    first_post_id = (Post.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+    importer = Importer(batch_size)
+    dataset = Dataset(posts, seed)
+    for number, record in enumerate(dataset.records(first_post_id), 1):
+        if importer.add(record):
+            importer.flush()
+            if progress is not None:
+                progress(number)
+    importer.flush()
+    return importer.written
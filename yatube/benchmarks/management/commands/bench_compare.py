@@ -0,0 +1,31 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.runner import compare
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает два отчёта bench_run; при регрессии завершается '
+        'с ошибкой.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('old')
+        parser.add_argument('new')
+        parser.add_argument(
+            '--threshold', type=float, default=0.1,
+            help='Допустимый рост p95 (0.1 — 10%%).',
+        )
+
+    def handle(self, *args, **options):
+        reports = []
+        for path in (options['old'], options['new']):
+            with open(path, encoding='utf-8') as file:
+                reports.append(json.load(file))
+        lines, regressions = compare(*reports, options['threshold'])
+        for line in lines:
+            self.stdout.write(line)
+        if regressions:
+            raise CommandError(f'Регрессии: {", ".join(regressions)}')
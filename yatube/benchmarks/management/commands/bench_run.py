@@ -0,0 +1,47 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from benchmarks.runner import DRIVERS, run
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогоняет адреса posts/urls.py и сохраняет p50/p95/p99, '
+        'пропускную способность и число запросов в JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('-o', '--output', help='Файл для JSON-отчёта.')
+        parser.add_argument(
+            '--driver', choices=tuple(DRIVERS), default='client',
+            help='client — тестовый клиент, wsgi — локальный HTTP-сервер.',
+        )
+        parser.add_argument('--requests', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кеш перед каждым запросом.',
+        )
+        parser.add_argument(
+            '--view', action='append', dest='views',
+            help='Только это представление (можно несколько раз).',
+        )
+
+    def handle(self, *args, **options):
+        def progress(name, stats):
+            self.stdout.write(
+                f"{name}: p50 {stats['p50_ms']} мс, p95 {stats['p95_ms']} "
+                f"мс, p99 {stats['p99_ms']} мс, {stats['rps']} rps, "
+                f"запросов {stats['queries_max']}"
+            )
+
+        report = run(
+            options['driver'], options['requests'], options['warmup'],
+            options['cold'], options['views'], progress,
+        )
+        for name, reason in report['skipped'].items():
+            self.stdout.write(f'{name}: пропущено ({reason})')
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
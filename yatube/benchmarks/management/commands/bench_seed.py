@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.dataset import SCALES, seed
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу воспроизводимым набором для нагрузочных тестов. '
+        'Запускайте на отдельной базе: данные пишутся в настроенную.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale', choices=tuple(SCALES), default='10k',
+            help='Число постов: tiny, 10k, 1m или 10m.',
+        )
+        parser.add_argument('--posts', type=int, help='Точное число постов.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Добавить набор даже в непустую базу.',
+        )
+
+    def handle(self, *args, **options):
+        if Post.objects.exists() and not options['force']:
+            raise CommandError('В базе уже есть посты; добавьте --force')
+        posts = options['posts'] or SCALES[options['scale']]
+
+        def progress(number):
+            if options['verbosity'] > 1:
+                self.stdout.write(f'записей: {number}')
+
+        written = seed(
+            posts, options['seed'], options['batch_size'], progress)
+        for kind, count in written.items():
+            self.stdout.write(f'{kind}: {count}')
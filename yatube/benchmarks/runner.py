@@ -0,0 +1,279 @@
+"""Прогон адресов ``posts/urls.py`` и статистика по каждому представлению.
+
+Запросы идут либо через тестовый ``Client`` в том же процессе, либо
+через локальный WSGI-сервер (``wsgiref``) — тогда в замер попадают
+и middleware, и разбор HTTP. В обоих случаях SQL-запросы считаются
+через ``connection.execute_wrapper``.
+"""
+import math
+import platform
+import subprocess
+import threading
+import time
+from urllib.request import Request, urlopen
+from wsgiref.simple_server import WSGIRequestHandler, make_server
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from core.decorators import QueryCounter
+from posts.models import Follow, Group, Post, User, UserStats
+from posts.urls import urlpatterns
+
+# Представления, которые меняют данные: в замер не попадают.
+SKIPPED = {
+    'add_comment': 'только POST',
+    'profile_follow': 'меняет подписки',
+    'profile_unfollow': 'меняет подписки',
+}
+STAFF_USERNAME = 'bench_staff'
+
+
+def percentile(values, percent):
+    """Перцентиль по рангу (nearest-rank) для отсортированного списка."""
+    rank = max(1, math.ceil(percent / 100 * len(values)))
+    return values[rank - 1]
+
+
+def _first(queryset, *fields):
+    return queryset.values_list(*fields).first() or (None,) * len(fields)
+
+
+def build_targets():
+    """Адрес и пользователь для каждого представления ``posts``.
+
+    Берутся самые «тяжёлые» объекты набора: самый популярный автор,
+    самая большая группа, подписчик с наибольшим числом подписок.
+    """
+    author, = _first(
+        UserStats.objects.order_by('-followers_count', 'user_id'), 'user_id')
+    reader, = _first(
+        UserStats.objects.order_by('-following_count', 'user_id'), 'user_id')
+    slug, = _first(Group.objects.order_by('-posts_count', 'pk'), 'slug')
+    post_id, post_author, text = _first(
+        Post.objects.filter(author_id=author).order_by('-pub_date', '-id'),
+        'pk', 'author_id', 'text',
+    )
+    username, = _first(User.objects.filter(pk=author), 'username')
+    if post_id is None:
+        raise ValueError('В базе нет постов: сначала bench_seed')
+    staff, _ = User.objects.get_or_create(
+        username=STAFF_USERNAME, defaults={'is_staff': True})
+    word = max(text.split(), key=len).strip('.,!?')
+    return {
+        'index': (reverse('posts:index'), None),
+        'group_list': (
+            reverse('posts:group_list', kwargs={'slug': slug}), None),
+        'profile': (
+            reverse('posts:profile', kwargs={'username': username}), None),
+        'post_detail': (
+            reverse('posts:post_detail', kwargs={'post_id': post_id}), None),
+        'post_comments': (
+            reverse('posts:post_comments', kwargs={'post_id': post_id}),
+            None,
+        ),
+        'post_create': (reverse('posts:post_create'), reader),
+        'post_edit': (
+            reverse('posts:post_edit', kwargs={'post_id': post_id}),
+            post_author,
+        ),
+        'search': (f"{reverse('posts:search')}?q={word}", None),
+        'export': (f"{reverse('posts:export')}?group={slug}", staff.pk),
+        'follow_index': (reverse('posts:follow_index'), reader),
+    }
+
+
+class ClientDriver:
+    """Запросы через тестовый клиент Django в этом же процессе."""
+
+    name = 'client'
+
+    def __init__(self):
+        self.clients = {}
+
+    def client(self, user_id):
+        if user_id not in self.clients:
+            client = Client()
+            if user_id is not None:
+                client.force_login(User.objects.get(pk=user_id))
+            self.clients[user_id] = client
+        return self.clients[user_id]
+
+    def get(self, path, user_id):
+        client = self.client(user_id)
+        counter = QueryCounter()
+        started = time.perf_counter()
+        with connection.execute_wrapper(counter):
+            response = client.get(path)
+            if response.streaming:
+                for _ in response.streaming_content:
+                    pass
+        elapsed = time.perf_counter() - started
+        return response.status_code, elapsed, counter.count
+
+    def close(self):
+        pass
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class WSGIDriver(ClientDriver):
+    """Запросы по HTTP к локальному однопоточному WSGI-серверу."""
+
+    name = 'wsgi'
+
+    def __init__(self):
+        super().__init__()
+        self.application = get_wsgi_application()
+        self.queries = 0
+        self.server = make_server(
+            '127.0.0.1', 0, self.counting_app, handler_class=_QuietHandler)
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def counting_app(self, environ, start_response):
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            body = b''.join(self.application(environ, start_response))
+        self.queries = counter.count
+        return [body]
+
+    def get(self, path, user_id):
+        host, port = self.server.server_address
+        request = Request(f'http://{host}:{port}{path}')
+        if user_id is not None:
+            cookie = self.client(user_id).cookies[
+                settings.SESSION_COOKIE_NAME].value
+            request.add_header(
+                'Cookie', f'{settings.SESSION_COOKIE_NAME}={cookie}')
+        started = time.perf_counter()
+        with urlopen(request) as response:
+            response.read()
+            status = response.status
+        return status, time.perf_counter() - started, self.queries
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+DRIVERS = {driver.name: driver for driver in (ClientDriver, WSGIDriver)}
+
+
+def measure(driver, path, user_id, requests, warmup=0, cold=False):
+    """Статистика одного адреса: перцентили, пропускная способность."""
+    for _ in range(warmup):
+        driver.get(path, user_id)
+    timings = []
+    queries = []
+    statuses = set()
+    for _ in range(requests):
+        if cold:
+            cache.clear()
+        status, elapsed, count = driver.get(path, user_id)
+        statuses.add(status)
+        timings.append(elapsed)
+        queries.append(count)
+    timings.sort()
+    return {
+        'path': path,
+        'status': sorted(statuses),
+        'requests': requests,
+        'p50_ms': round(percentile(timings, 50) * 1000, 3),
+        'p95_ms': round(percentile(timings, 95) * 1000, 3),
+        'p99_ms': round(percentile(timings, 99) * 1000, 3),
+        'mean_ms': round(sum(timings) / requests * 1000, 3),
+        'rps': round(requests / sum(timings), 1),
+        'queries_mean': round(sum(queries) / requests, 2),
+        'queries_max': max(queries),
+    }
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, cwd=settings.BASE_DIR,
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run(driver_name='client', requests=50, warmup=5, cold=False,
+        views=None, progress=None):
+    """Прогнать представления ``posts`` и собрать отчёт для JSON."""
+    targets = build_targets()
+    report = {
+        'meta': {
+            'created': timezone.now().isoformat(),
+            'driver': driver_name,
+            'requests': requests,
+            'warmup': warmup,
+            'cold': cold,
+            'revision': _git_revision(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'dataset': {
+                'posts': Post.objects.count(),
+                'users': User.objects.count(),
+                'follows': Follow.objects.count(),
+            },
+        },
+        'views': {},
+        'skipped': {},
+    }
+    driver = DRIVERS[driver_name]()
+    try:
+        for pattern in urlpatterns:
+            name = pattern.name
+            if views and name not in views:
+                continue
+            if name in SKIPPED or name not in targets:
+                report['skipped'][name] = SKIPPED.get(name, 'нет сценария')
+                continue
+            path, user_id = targets[name]
+            report['views'][name] = measure(
+                driver, path, user_id, requests, warmup, cold)
+            if progress is not None:
+                progress(name, report['views'][name])
+    finally:
+        driver.close()
+    return report
+
+
+def compare(old, new, threshold=0.1):
+    """Строки сравнения двух отчётов и список регрессий.
+
+    Регрессия — рост p95 больше чем на ``threshold`` или рост
+    максимального числа запросов.
+    """
+    lines = []
+    regressions = []
+    for name, current in new['views'].items():
+        previous = old['views'].get(name)
+        if previous is None:
+            lines.append(f'{name}: нет в старом отчёте')
+            continue
+        change = current['p95_ms'] / previous['p95_ms'] - 1 \
+            if previous['p95_ms'] else 0
+        slower = change > threshold
+        more_queries = current['queries_max'] > previous['queries_max']
+        mark = ' РЕГРЕССИЯ' if slower or more_queries else ''
+        lines.append(
+            f"{name}: p95 {previous['p95_ms']} → {current['p95_ms']} мс "
+            f"({change:+.0%}), запросов {previous['queries_max']} → "
+            f"{current['queries_max']}{mark}"
+        )
+        if mark:
+            regressions.append(name)
+    return lines, regressions
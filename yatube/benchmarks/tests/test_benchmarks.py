@@ -0,0 +1,51 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from posts.models import Follow, Post, UserStats
+
+from ..dataset import Dataset, seed
+from ..runner import compare, percentile, run
+
+
+class BenchmarkTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_dataset_is_reproducible_and_skewed(self):
+        '''Одно зерно даёт один набор; подписчики у авторов неравны.'''
+        first = list(Dataset(200, seed=1).records())
+        self.assertEqual(first, list(Dataset(200, seed=1).records()))
+        self.assertNotEqual(first, list(Dataset(200, seed=2).records()))
+
+        seed(200, seed=1)
+        self.assertEqual(Post.objects.count(), 200)
+        followers = list(
+            UserStats.objects.order_by('-followers_count')
+            .values_list('followers_count', flat=True))
+        self.assertEqual(sum(followers), Follow.objects.count())
+        self.assertGreater(followers[0], followers[-1])
+
+    def test_run_reports_every_read_view(self):
+        '''Прогон даёт статистику по каждому читающему представлению.'''
+        seed(200, seed=1)
+        report = run(requests=3, warmup=1)
+        self.assertIn('add_comment', report['skipped'])
+        for name in ('index', 'profile', 'post_detail', 'follow_index'):
+            with self.subTest(view=name):
+                stats = report['views'][name]
+                self.assertEqual(stats['status'], [200])
+                self.assertLessEqual(stats['p50_ms'], stats['p99_ms'])
+                self.assertGreater(stats['rps'], 0)
+
+    def test_compare_flags_regressions(self):
+        '''Рост p95 сверх порога и рост числа запросов — регрессии.'''
+        def report(p95, queries):
+            return {'views': {'index': {
+                'p95_ms': p95, 'queries_max': queries}}}
+
+        self.assertEqual(compare(report(10, 3), report(10.5, 3))[1], [])
+        self.assertEqual(
+            compare(report(10, 3), report(12, 3))[1], ['index'])
+        self.assertEqual(
+            compare(report(10, 3), report(9, 4))[1], ['index'])
+        self.assertEqual(percentile([1, 2, 3, 4], 50), 2)
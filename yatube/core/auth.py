@@ -0,0 +1,77 @@
+"""Пользователь запроса из кеша, без запроса к ``auth_user``.
+
+После первой загрузки из базы в общий кеш кладётся снимок пользователя:
+несколько полей и хеш для проверки сессии. Следующие запросы собирают
+пользователя из снимка; остальные поля (в том числе пароль) отложены
+и при обращении догружаются из базы, а ``save()`` их не затирает.
+Снимок удаляется при любом сохранении пользователя (смена пароля,
+вход) и при выходе.
+"""
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.utils.crypto import constant_time_compare
+
+SNAPSHOT_KEY = 'user-snapshot:{}'
+SNAPSHOT_FIELDS = (
+    'id', 'username', 'first_name', 'last_name', 'email',
+    'is_staff', 'is_active', 'is_superuser',
+)
+
+
+def _cache():
+    return caches[settings.USER_SNAPSHOT_CACHE_ALIAS]
+
+
+def snapshot(user):
+    data = {field: getattr(user, field) for field in SNAPSHOT_FIELDS}
+    data['session_hash'] = user.get_session_auth_hash()
+    return data
+
+
+def restore(data):
+    model = get_user_model()
+    # from_db ждёт значения в порядке полей модели.
+    fields = [
+        field.attname for field in model._meta.concrete_fields
+        if field.attname in SNAPSHOT_FIELDS
+    ]
+    return model.from_db(
+        'default', fields, [data[field] for field in fields])
+
+
+def forget(user_id):
+    _cache().delete(SNAPSHOT_KEY.format(user_id))
+
+
+def _from_snapshot(request):
+    session = request.session
+    try:
+        user_id = session[auth.SESSION_KEY]
+        backend = session[auth.BACKEND_SESSION_KEY]
+    except KeyError:
+        return None
+    if backend not in settings.AUTHENTICATION_BACKENDS:
+        return None
+    data = _cache().get(SNAPSHOT_KEY.format(user_id))
+    if data is None or not constant_time_compare(
+            session.get(auth.HASH_SESSION_KEY, ''), data['session_hash']):
+        return None
+    user = restore(data)
+    user.backend = backend
+    return user
+
+
+def get_user(request):
+    """Пользователь из снимка, иначе — как ``django.contrib.auth``."""
+    user = _from_snapshot(request)
+    if user is not None:
+        return user
+    user = auth.get_user(request)
+    if user.is_authenticated:
+        _cache().set(
+            SNAPSHOT_KEY.format(user.pk), snapshot(user),
+            settings.USER_SNAPSHOT_TIMEOUT,
+        )
+    return user
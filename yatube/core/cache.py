@@ -0,0 +1,158 @@
+"""Двухуровневый кеш: LRU в памяти процесса (L1) перед общим кешем (L2).
+
+L1 держит записи лишь ``L1_TIMEOUT`` секунд и не больше
+``L1_MAX_ENTRIES`` штук. Страницы и карточки адресуются версиями и
+хешами содержимого, поэтому их копии в L1 не устаревают; сами же
+версии (ключи с префиксами из ``L1_BYPASS_PREFIXES``) всегда читаются
+из L2, и сброс версии в одном процессе сразу виден остальным.
+"""
+import pickle
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+# Как и в LocMemCache: один L1 на процесс, общий для всех потоков.
+_stores = {}
+_locks = {}
+
+_MISSING = object()
+
+
+class TwoTierCache(BaseCache):
+    """``LOCATION`` — имя общего кеша (L2) в ``settings.CACHES``."""
+
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._l2_alias = location
+        self._l1_max_entries = int(options.get('L1_MAX_ENTRIES', 1000))
+        self._l1_timeout = float(options.get('L1_TIMEOUT', 5))
+        self._l1_bypass = tuple(options.get('L1_BYPASS_PREFIXES', ()))
+        self._l1 = _stores.setdefault(location, OrderedDict())
+        self._lock = _locks.setdefault(location, Lock())
+
+    @property
+    def l2(self):
+        return caches[self._l2_alias]
+
+    def _l1_key(self, key, version):
+        if key.startswith(self._l1_bypass):
+            return None
+        return self.make_key(key, version=version)
+
+    def _l1_get(self, l1_key):
+        if l1_key is None:
+            return _MISSING
+        with self._lock:
+            entry = self._l1.get(l1_key)
+            if entry is None:
+                return _MISSING
+            expires, pickled = entry
+            if expires <= time.monotonic():
+                del self._l1[l1_key]
+                return _MISSING
+            self._l1.move_to_end(l1_key)
+        return pickle.loads(pickled)
+
+    def _l1_set(self, l1_key, value, timeout=DEFAULT_TIMEOUT):
+        if l1_key is None:
+            return
+        # Копия хранится в pickle: объекты из кеша (например, ответы)
+        # потом изменяются middleware, и это не должно задеть L1.
+        pickled = pickle.dumps(value, self.pickle_protocol)
+        ttl = self._l1_timeout
+        if timeout is not DEFAULT_TIMEOUT and timeout is not None:
+            ttl = min(ttl, timeout)
+        with self._lock:
+            self._l1[l1_key] = (time.monotonic() + ttl, pickled)
+            self._l1.move_to_end(l1_key)
+            while len(self._l1) > self._l1_max_entries:
+                self._l1.popitem(last=False)
+
+    def _l1_discard(self, *keys, version=None):
+        with self._lock:
+            for key in keys:
+                self._l1.pop(self.make_key(key, version=version), None)
+
+    def get(self, key, default=None, version=None):
+        l1_key = self._l1_key(key, version)
+        value = self._l1_get(l1_key)
+        if value is not _MISSING:
+            return value
+        value = self.l2.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            return default
+        self._l1_set(l1_key, value)
+        return value
+
+    def get_many(self, keys, version=None):
+        found = {}
+        missing = []
+        for key in keys:
+            value = self._l1_get(self._l1_key(key, version))
+            if value is _MISSING:
+                missing.append(key)
+            else:
+                found[key] = value
+        if missing:
+            from_l2 = self.l2.get_many(missing, version=version)
+            for key, value in from_l2.items():
+                self._l1_set(self._l1_key(key, version), value)
+            found.update(from_l2)
+        return found
+
+    def has_key(self, key, version=None):
+        if self._l1_get(self._l1_key(key, version)) is not _MISSING:
+            return True
+        return self.l2.has_key(key, version=version)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.l2.set(key, value, timeout, version=version)
+        if timeout is not None and timeout is not DEFAULT_TIMEOUT \
+                and timeout <= 0:
+            self._l1_discard(key, version=version)
+        else:
+            self._l1_set(self._l1_key(key, version), value, timeout)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.l2.set_many(data, timeout, version=version)
+        for key, value in data.items():
+            if key not in failed:
+                self._l1_set(self._l1_key(key, version), value, timeout)
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._l1_discard(key, version=version)
+        return self.l2.add(key, value, timeout, version=version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.l2.touch(key, timeout, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        self._l1_discard(key, version=version)
+        return self.l2.incr(key, delta, version=version)
+
+    def decr(self, key, delta=1, version=None):
+        self._l1_discard(key, version=version)
+        return self.l2.decr(key, delta, version=version)
+
+    def delete(self, key, version=None):
+        self._l1_discard(key, version=version)
+        self.l2.delete(key, version=version)
+
+    def delete_many(self, keys, version=None):
+        self._l1_discard(*keys, version=version)
+        self.l2.delete_many(keys, version=version)
+
+    def clear(self):
+        with self._lock:
+            self._l1.clear()
+        self.l2.clear()
+
+    def close(self, **kwargs):
+        self.l2.close(**kwargs)
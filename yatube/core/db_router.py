@@ -0,0 +1,61 @@
+"""Чтение с реплик, запись в основную базу.
+
+Чтения уходят на случайную реплику из ``DATABASE_REPLICAS``, записи —
+в ``default``. После первой записи в запросе (или внутри транзакции)
+поток читает только из ``default``. Чтобы пользователь видел свои
+изменения и в следующих запросах, ``ReplicaStickinessMiddleware``
+закрепляет его за основной базой на ``REPLICA_STICKY_SECONDS``.
+"""
+import random
+import threading
+
+from django.conf import settings
+from django.db import connections
+
+PRIMARY = 'default'
+
+_state = threading.local()
+
+
+def pin(wrote=False):
+    """Читать из основной базы до ``reset``."""
+    _state.pinned = True
+    _state.wrote = getattr(_state, 'wrote', False) or wrote
+
+
+def reset():
+    _state.pinned = False
+    _state.wrote = False
+
+
+def is_pinned():
+    return getattr(_state, 'pinned', False)
+
+
+def wrote():
+    """Был ли в текущем запросе хоть один запрос на запись."""
+    return getattr(_state, 'wrote', False)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas or is_pinned() \
+                or connections[PRIMARY].in_atomic_block:
+            return PRIMARY
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        pin(wrote=True)
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        pool = {PRIMARY, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
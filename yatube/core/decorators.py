@@ -0,0 +1,53 @@
+import functools
+import logging
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+class QueryCounter:
+    """Обёртка для ``connection.execute_wrapper``, считающая запросы."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def all_connections_wrapper(wrapper):
+    """``execute_wrapper`` сразу на всех базах: основной и репликах."""
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(wrapper))
+        yield wrapper
+
+
+def query_budget(limit):
+    """Объявляет, сколько SQL-запросов может сделать представление.
+
+    Лимит сохраняется в ``view.query_budget`` для тестов, а в режиме
+    ``DEBUG`` каждое превышение пишется в лог предупреждением.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not settings.DEBUG:
+                return view(request, *args, **kwargs)
+            counter = QueryCounter()
+            with all_connections_wrapper(counter):
+                response = view(request, *args, **kwargs)
+            if counter.count > limit:
+                logger.warning(
+                    '%s: %d SQL-запросов при бюджете %d',
+                    request.path, counter.count, limit,
+                )
+            return response
+        wrapper.query_budget = limit
+        return wrapper
+    return decorator
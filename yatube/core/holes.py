@@ -0,0 +1,59 @@
+"""Общий кеш страниц с «дырами» под персональные фрагменты.
+
+Страница рендерится один раз для всех пользователей: вместо фрагментов,
+зависящих от пользователя (шапка, вкладки ленты, кнопка подписки),
+тег ``{% hole %}`` оставляет метку с именем шаблона и параметрами.
+Закешированное тело общее, а метки на каждом запросе заменяются
+фрагментами, отрендеренными для текущего пользователя (``splice``).
+Данные фрагмента, которых нет в параметрах, даёт функция,
+зарегистрированная через ``@provider``. Пользовательский текст на
+странице экранируется, поэтому подделать метку он не может.
+"""
+import base64
+import json
+import re
+
+from django.template.loader import render_to_string
+
+MARKER = '<!--hole:{}-->'
+MARKER_RE = re.compile(rb'<!--hole:([A-Za-z0-9_=-]+)-->')
+
+_providers = {}
+
+
+def provider(template_name):
+    """Зарегистрировать источник персональных данных фрагмента."""
+    def decorator(func):
+        _providers[template_name] = func
+        return func
+    return decorator
+
+
+def is_punching(request):
+    return getattr(request, 'punch_holes', False)
+
+
+def marker(template_name, params):
+    payload = json.dumps([template_name, params], ensure_ascii=False)
+    return MARKER.format(
+        base64.urlsafe_b64encode(payload.encode()).decode())
+
+
+def render_hole(request, template_name, params):
+    context = dict(params)
+    func = _providers.get(template_name)
+    if func is not None:
+        context.update(func(request, **params))
+    return render_to_string(template_name, context, request=request)
+
+
+def splice(request, response):
+    """Заменить метки в ответе фрагментами текущего пользователя."""
+    def fill(match):
+        template_name, params = json.loads(
+            base64.urlsafe_b64decode(match.group(1)))
+        return render_hole(request, template_name, params).encode(
+            response.charset)
+
+    response.content = MARKER_RE.sub(fill, response.content)
+    return response
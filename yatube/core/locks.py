@@ -0,0 +1,86 @@
+"""Межпроцессные блокировки.
+
+Блокировка берётся в общем кеше ``LOCKS_CACHE`` через ``add``: у
+memcached, Redis и кеша в памяти он атомарен, и блокировка общая для
+всех серверов. Исключение — файловый кеш, локальная замена общего: его
+``add`` — это ``has_key`` и затем ``set``, так что два процесса могут
+взять одну блокировку. Для него блокировка — файл в ``LOCKS_DIR``,
+созданный с ``O_CREAT | O_EXCL``: создать его удаётся ровно одному.
+Файл старше ``timeout`` секунд считается брошенным (процесс упал, не
+сняв блокировку), и его забирает один из претендентов.
+"""
+import hashlib
+import os
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.filebased import FileBasedCache
+
+KEY = 'lock:{}'
+
+
+def _path(name):
+    digest = hashlib.md5(name.encode()).hexdigest()
+    return os.path.join(settings.LOCKS_DIR, f'{digest}.lock')
+
+
+def _create(path):
+    try:
+        os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+    except FileExistsError:
+        return False
+    return True
+
+
+def _expired(path, timeout):
+    try:
+        return os.path.getmtime(path) < time.time() - timeout
+    except FileNotFoundError:
+        return True
+
+
+def _cache():
+    """Кеш с атомарным ``add`` или ``None`` для файлового кеша."""
+    backend = caches[settings.LOCKS_CACHE]
+    return None if isinstance(backend, FileBasedCache) else backend
+
+
+def acquire(name, timeout):
+    """Взять блокировку ``name``; ``False``, если она занята."""
+    cache = _cache()
+    if cache is not None:
+        return cache.add(KEY.format(name), True, timeout)
+    path = _path(name)
+    os.makedirs(settings.LOCKS_DIR, exist_ok=True)
+    if _create(path):
+        return True
+    if not _expired(path, timeout):
+        return False
+    # Брошенный файл переименовывает только один из претендентов.
+    abandoned = f'{path}.{uuid.uuid4().hex}'
+    try:
+        os.rename(path, abandoned)
+    except FileNotFoundError:
+        return False
+    os.remove(abandoned)
+    return _create(path)
+
+
+def is_locked(name):
+    cache = _cache()
+    if cache is not None:
+        return cache.get(KEY.format(name)) is not None
+    return os.path.exists(_path(name))
+
+
+def release(name):
+    cache = _cache()
+    if cache is not None:
+        cache.delete(KEY.format(name))
+        return
+    try:
+        os.remove(_path(name))
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,55 @@
+import sqlite3
+import time
+from contextlib import closing
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core.db_router import PRIMARY
+
+
+def _sqlite_name(alias):
+    database = connections[alias].settings_dict
+    if database['ENGINE'] != 'django.db.backends.sqlite3':
+        raise CommandError(
+            f'{alias}: не SQLite, реплику обновляет сама СУБД')
+    return database['NAME']
+
+
+def copy_database(source, target):
+    """Согласованная копия базы SQLite через backup API."""
+    with closing(sqlite3.connect(source)) as src, \
+            closing(sqlite3.connect(target)) as dst:
+        src.backup(dst)
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует основную базу SQLite в реплики из DATABASE_REPLICAS. '
+        'С --lag копирует раз в N секунд, изображая отставание реплик.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lag', type=float, default=0,
+            help='Период копирования в секундах; 0 — скопировать один раз.',
+        )
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError('Реплики не настроены: задайте YATUBE_REPLICAS')
+        if options['lag'] > settings.REPLICA_MAX_LAG:
+            raise CommandError(
+                f'Отставание больше REPLICA_MAX_LAG '
+                f'({settings.REPLICA_MAX_LAG} с): пользователи увидят '
+                f'устаревшие данные после своих изменений')
+        source = _sqlite_name(PRIMARY)
+        targets = [_sqlite_name(alias) for alias in settings.DATABASE_REPLICAS]
+        while True:
+            for target in targets:
+                copy_database(source, target)
+            self.stdout.write(f'Реплик обновлено: {len(targets)}')
+            if not options['lag']:
+                return
+            time.sleep(options['lag'])
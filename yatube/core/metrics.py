@@ -0,0 +1,203 @@
+"""Метрики в текстовом формате Prometheus.
+
+Каждый процесс копит счётчики и гистограммы в памяти и не чаще раза в
+``METRICS_FLUSH_INTERVAL`` секунд сбрасывает их снимок в свой файл в
+``METRICS_DIR``. Адрес ``/metrics`` складывает снимки всех процессов,
+поэтому неважно, какой из воркеров ответит Prometheus. Значения в
+файлах только растут; файлы остановленных процессов остаются, так что
+суммы не уменьшаются. Каталог очищают при развёртывании.
+"""
+import bisect
+import glob
+import os
+import pickle
+import time
+from threading import Lock
+
+from django.conf import settings
+
+from .decorators import QueryCounter
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+# Имя: (тип, описание, границы корзин гистограммы).
+METRICS = {
+    'yatube_requests_total': (
+        'counter', 'Запросы по представлениям и кодам ответа.', None),
+    'yatube_request_duration_seconds': (
+        'histogram', 'Время ответа представления.', LATENCY_BUCKETS),
+    'yatube_db_queries': (
+        'histogram', 'SQL-запросов на HTTP-запрос.', QUERY_BUCKETS),
+    'yatube_db_duration_seconds': (
+        'histogram', 'Время SQL-запросов за HTTP-запрос.', LATENCY_BUCKETS),
+    'yatube_template_render_seconds': (
+        'histogram', 'Время рендера шаблона.', LATENCY_BUCKETS),
+    'yatube_page_cache_total': (
+        'counter', 'Попадания и промахи кеша страниц.', None),
+}
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class QueryTimer(QueryCounter):
+    """Считает запросы и их суммарное время."""
+
+    def __init__(self):
+        super().__init__()
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return super().__call__(execute, sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+
+
+def _labels(labels):
+    return tuple(sorted(labels.items()))
+
+
+class Registry:
+    """Значения метрик одного процесса.
+
+    Счётчик — число, гистограмма — список: количества по корзинам
+    (последняя — ``+Inf``), затем сумма и общее количество.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._values = {}
+        self._flushed = time.monotonic()
+
+    def clear(self):
+        with self._lock:
+            self._values = {}
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        buckets = METRICS[name][2]
+        key = (name, _labels(labels))
+        index = bisect.bisect_left(buckets, value)
+        with self._lock:
+            histogram = self._values.get(key)
+            if histogram is None:
+                histogram = self._values[key] = [0] * (len(buckets) + 3)
+            histogram[index] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                key: list(value) if isinstance(value, list) else value
+                for key, value in self._values.items()
+            }
+
+    def flush(self):
+        """Записать снимок в файл процесса (атомарно, через ``replace``)."""
+        self._flushed = time.monotonic()
+        directory = settings.METRICS_DIR
+        if not directory:
+            return
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{os.getpid()}.pickle')
+        with open(f'{path}.tmp', 'wb') as file:
+            pickle.dump(self.snapshot(), file, pickle.HIGHEST_PROTOCOL)
+        os.replace(f'{path}.tmp', path)
+
+    def maybe_flush(self):
+        interval = settings.METRICS_FLUSH_INTERVAL
+        if time.monotonic() - self._flushed >= interval:
+            self.flush()
+
+
+registry = Registry()
+
+
+def inc(name, amount=1, **labels):
+    registry.inc(name, amount, **labels)
+
+
+def observe(name, value, **labels):
+    registry.observe(name, value, **labels)
+
+
+def _merge(total, snapshot):
+    for key, value in snapshot.items():
+        current = total.get(key)
+        if current is None:
+            total[key] = list(value) if isinstance(value, list) else value
+        elif isinstance(value, list):
+            total[key] = [a + b for a, b in zip(current, value)]
+        else:
+            total[key] = current + value
+
+
+def collect():
+    """Сумма снимков всех процессов; свой берётся из памяти."""
+    total = registry.snapshot()
+    directory = settings.METRICS_DIR
+    if not directory:
+        return total
+    own = os.path.join(directory, f'{os.getpid()}.pickle')
+    for path in glob.glob(os.path.join(directory, '*.pickle')):
+        if path == own:
+            continue
+        try:
+            with open(path, 'rb') as file:
+                _merge(total, pickle.load(file))
+        except (OSError, EOFError, pickle.UnpicklingError):
+            continue
+    return total
+
+
+def _escape(value):
+    return (str(value).replace('\\', r'\\').replace('"', r'\"')
+            .replace('\n', r'\n'))
+
+
+def _format_labels(labels, *extra):
+    pairs = [f'{key}="{_escape(value)}"' for key, value in labels + extra]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _histogram_lines(name, buckets, labels, value):
+    cumulative = 0
+    bounds = [_number(bound) for bound in buckets] + ['+Inf']
+    for bound, count in zip(bounds, value):
+        cumulative += count
+        yield (f'{name}_bucket{_format_labels(labels, ("le", bound))} '
+               f'{cumulative}')
+    yield f'{name}_sum{_format_labels(labels)} {_number(value[-2])}'
+    yield f'{name}_count{_format_labels(labels)} {value[-1]}'
+
+
+def render(values):
+    """Текстовый формат экспозиции Prometheus."""
+    lines = []
+    for name, (kind, description, buckets) in METRICS.items():
+        series = sorted(
+            (labels, value) for (metric, labels), value in values.items()
+            if metric == name
+        )
+        if not series:
+            continue
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} {kind}')
+        for labels, value in series:
+            if kind == 'histogram':
+                lines.extend(_histogram_lines(name, buckets, labels, value))
+            else:
+                lines.append(
+                    f'{name}{_format_labels(labels)} {_number(value)}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,144 @@
+import cProfile
+import random
+import time
+
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+
+from . import auth, db_router, metrics, profiling
+from .decorators import all_connections_wrapper
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match is not None else 'unresolved'
+
+
+class MetricsMiddleware:
+    """Время ответа, число и время SQL-запросов по имени адреса.
+
+    Стоит первым в ``MIDDLEWARE``, чтобы в замер попало всё остальное.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = metrics.QueryTimer()
+        started = time.perf_counter()
+        with all_connections_wrapper(timer):
+            response = self.get_response(request)
+        duration = time.perf_counter() - started
+        view = _view_name(request)
+        metrics.inc(
+            'yatube_requests_total', view=view, method=request.method,
+            status=response.status_code,
+        )
+        metrics.observe('yatube_request_duration_seconds', duration, view=view)
+        metrics.observe('yatube_db_queries', timer.count, view=view)
+        metrics.observe(
+            'yatube_db_duration_seconds', timer.duration, view=view)
+        metrics.registry.maybe_flush()
+        return response
+
+
+class ProfilingMiddleware:
+    """Профиль ``cProfile`` запроса по токену сотрудника или выборочно.
+
+    Стоит после ``AuthenticationMiddleware``: токен проверяется по
+    текущему пользователю.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def _trigger(self, request):
+        if profiling.is_requested(request):
+            return 'staff'
+        rate = settings.PROFILING_SAMPLE_RATE
+        if rate and random.randrange(rate) == 0:
+            return 'sample'
+        return None
+
+    def __call__(self, request):
+        trigger = self._trigger(request)
+        if trigger is None:
+            return self.get_response(request)
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Процесс уже профилируется другим инструментом.
+            return self.get_response(request)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        user = getattr(request, 'user', None)
+        name = profiling.save(profiler, {
+            'created': timezone.now().isoformat(),
+            'method': request.method,
+            'path': request.get_full_path(),
+            'view': _view_name(request),
+            'status': response.status_code,
+            'duration_ms': round((time.perf_counter() - started) * 1000, 1),
+            'user': (
+                user.get_username()
+                if user is not None and user.is_authenticated else None),
+            'trigger': trigger,
+        })
+        if trigger == 'staff':
+            response['X-Yatube-Profile-Id'] = name
+        return response
+
+
+class ReplicaStickinessMiddleware:
+    """Читать из основной базы какое-то время после своей записи.
+
+    Момент последней записи хранится в куке; пока не прошло
+    ``REPLICA_STICKY_SECONDS``, запросы пользователя не читают реплики,
+    которые могут ещё не получить его изменения.
+    """
+
+    cookie_name = 'yatube_primary'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def _is_sticky(self, request):
+        try:
+            written = float(request.COOKIES.get(self.cookie_name, 0))
+        except ValueError:
+            return False
+        return time.time() - written < settings.REPLICA_STICKY_SECONDS
+
+    def __call__(self, request):
+        db_router.reset()
+        if self._is_sticky(request):
+            db_router.pin()
+        try:
+            response = self.get_response(request)
+            if db_router.wrote():
+                response.set_cookie(
+                    self.cookie_name, str(time.time()),
+                    max_age=settings.REPLICA_STICKY_SECONDS,
+                    httponly=True, samesite='Lax',
+                )
+        finally:
+            db_router.reset()
+        return response
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    """``request.user`` из снимка в кеше (см. ``core.auth``)."""
+
+    def process_request(self, request):
+        def get_user():
+            if not hasattr(request, '_cached_user'):
+                request._cached_user = auth.get_user(request)
+            return request._cached_user
+
+        request.user = SimpleLazyObject(get_user)
@@ -0,0 +1,109 @@
+"""Профилирование отдельных запросов на живом сайте.
+
+Запрос профилируется через ``cProfile``, если сотрудник включил это
+для себя (подписанная кука или заголовок ``X-Yatube-Profile``), или
+случайно, один из ``PROFILING_SAMPLE_RATE`` запросов. Профили пишутся в
+``PROFILING_DIR`` рядом с описанием в JSON; хранятся последние
+``PROFILING_MAX_FILES``, более старые удаляются.
+"""
+import io
+import json
+import os
+import pstats
+import re
+import time
+
+from django.conf import settings
+from django.core import signing
+
+COOKIE_NAME = 'yatube_profile'
+HEADER = 'HTTP_X_YATUBE_PROFILE'
+SALT = 'core.profiling'
+NAME_RE = re.compile(r'^\d+-\d+$')
+
+
+def make_token(user):
+    """Подписанный токен, включающий профилирование для сотрудника."""
+    return signing.dumps(user.pk, salt=SALT)
+
+
+def is_requested(request):
+    """Сотрудник прислал свой действующий токен в куке или заголовке.
+
+    Без токена пользователь не загружается: иначе каждый запрос читал
+    бы сессию и получал ``Vary: Cookie``.
+    """
+    token = request.META.get(HEADER) or request.COOKIES.get(COOKIE_NAME)
+    if not token:
+        return False
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_staff:
+        return False
+    try:
+        user_id = signing.loads(
+            token, salt=SALT, max_age=settings.PROFILING_TOKEN_AGE)
+    except signing.BadSignature:
+        return False
+    return user_id == user.pk
+
+
+def save(profiler, meta):
+    """Сохранить профиль и описание; вернуть имя профиля."""
+    directory = settings.PROFILING_DIR
+    os.makedirs(directory, exist_ok=True)
+    name = f'{time.time_ns()}-{os.getpid()}'
+    profiler.dump_stats(os.path.join(directory, f'{name}.prof'))
+    with open(os.path.join(directory, f'{name}.json'), 'w') as file:
+        json.dump(meta, file, ensure_ascii=False)
+    prune()
+    return name
+
+
+def _names():
+    """Имена профилей, от новых к старым."""
+    try:
+        files = os.listdir(settings.PROFILING_DIR)
+    except FileNotFoundError:
+        return []
+    names = {
+        name[:-len('.json')] for name in files if name.endswith('.json')}
+    return sorted(
+        names, key=lambda name: int(name.split('-')[0]), reverse=True)
+
+
+def prune():
+    """Удалить профили сверх ``PROFILING_MAX_FILES``."""
+    for name in _names()[settings.PROFILING_MAX_FILES:]:
+        for extension in ('.json', '.prof'):
+            try:
+                os.remove(profile_path(name, extension))
+            except FileNotFoundError:
+                pass
+
+
+def profile_path(name, extension='.prof'):
+    if not NAME_RE.match(name):
+        raise ValueError(f'некорректное имя профиля {name!r}')
+    return os.path.join(settings.PROFILING_DIR, name + extension)
+
+
+def profiles():
+    """Описания сохранённых профилей, от новых к старым."""
+    result = []
+    for name in _names():
+        try:
+            with open(profile_path(name, '.json')) as file:
+                meta = json.load(file)
+        except (OSError, ValueError):
+            continue
+        meta['name'] = name
+        result.append(meta)
+    return result
+
+
+def summary(name, limit=40):
+    """Самые дорогие функции профиля текстом ``pstats``."""
+    stream = io.StringIO()
+    stats = pstats.Stats(profile_path(name), stream=stream)
+    stats.sort_stats('cumulative').print_stats(limit)
+    return stream.getvalue()
@@ -0,0 +1,19 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.signals import user_logged_out
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import auth
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def forget_user_snapshot(sender, instance, **kwargs):
+    """Снимок устарел: изменились поля, пароль или время входа."""
+    auth.forget(instance.pk)
+
+
+@receiver(user_logged_out)
+def forget_snapshot_on_logout(sender, request, user, **kwargs):
+    if user is not None:
+        auth.forget(user.pk)
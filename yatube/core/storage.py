@@ -0,0 +1,68 @@
+"""Статика с хешем в имени и заранее сжатыми копиями.
+
+``collectstatic`` кладёт рядом с каждым хешированным текстовым файлом
+``.gz`` и, если установлен пакет ``brotli``, ``.br``. Имена с хешем
+меняются вместе с содержимым, поэтому ``core.views.serve_static``
+отдаёт их с ``Cache-Control: immutable``.
+"""
+import gzip
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = ('.css', '.js', '.svg', '.ico', '.txt', '.json', '.xml')
+
+
+def compressors():
+    """Пары (расширение, функция сжатия) для доступных кодировок."""
+    result = [('.gz', lambda data: gzip.compress(data, 9, mtime=0))]
+    if brotli is not None:
+        result.insert(0, ('.br', brotli.compress))
+    return result
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    manifest_strict = False
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._hashed_names = None
+
+    def is_hashed(self, name):
+        """Имя с хешем из манифеста (множество строится один раз)."""
+        if self._hashed_names is None:
+            self._hashed_names = frozenset(self.hashed_files.values())
+        return name in self._hashed_names
+
+    def stored_name(self, name):
+        # До collectstatic манифеста нет: отдаём исходное имя.
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        self._hashed_names = None
+        # CSS проходит несколько проходов; сжимаем только итоговые имена.
+        if not dry_run:
+            for hashed_name in set(self.hashed_files.values()):
+                self.compress(hashed_name)
+
+    def compress(self, name):
+        """Записать сжатые копии файла, если они меньше исходного."""
+        if not name.endswith(COMPRESSIBLE):
+            return
+        with self.open(name) as file:
+            data = file.read()
+        for extension, compress in compressors():
+            compressed = compress(data)
+            if len(compressed) < len(data):
+                if self.exists(name + extension):
+                    self.delete(name + extension)
+                self._save(name + extension, ContentFile(compressed))
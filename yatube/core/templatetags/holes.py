@@ -0,0 +1,52 @@
+from django import template
+from django.template.base import token_kwargs
+from django.utils.safestring import mark_safe
+
+from .. import holes
+
+register = template.Library()
+
+
+def _plain(value):
+    # В метку попадают только значения, которые переживут JSON.
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return value
+    return str(value)
+
+
+class HoleNode(template.Node):
+    def __init__(self, template_name, params):
+        self.template_name = template_name
+        self.params = params
+
+    def render(self, context):
+        name = self.template_name.resolve(context)
+        params = {
+            key: _plain(value.resolve(context))
+            for key, value in self.params.items()
+        }
+        request = context.get('request')
+        if request is not None and holes.is_punching(request):
+            return mark_safe(holes.marker(name, params))
+        included = context.template.engine.get_template(name)
+        with context.push(**params):
+            return included.render(context)
+
+
+@register.tag
+def hole(parser, token):
+    """Персональный фрагмент страницы (см. ``core.holes``).
+
+    ``{% hole 'includes/header.html' query=query %}`` работает как
+    ``include``, а при рендере общей страницы оставляет метку.
+    Параметры не должны зависеть от пользователя.
+    """
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(
+            f'{bits[0]}: нужно имя шаблона')
+    params = token_kwargs(bits[2:], parser)
+    if len(params) != len(bits) - 2:
+        raise template.TemplateSyntaxError(
+            f'{bits[0]}: параметры передаются как имя=значение')
+    return HoleNode(parser.compile_filter(bits[1]), params)
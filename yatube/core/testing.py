@@ -0,0 +1,64 @@
+import copy
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.test.runner import DiscoverRunner
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import resolve
+
+
+@contextmanager
+def run_on_commit(using=DEFAULT_DB_ALIAS):
+    """Выполнить ``on_commit``, отложенные внутри блока.
+
+    ``TestCase`` откатывает транзакцию теста, и без этого сброс кеша
+    после фиксации в тестах не происходил бы.
+    """
+    start = len(connections[using].run_on_commit)
+    yield
+    for _, callback in connections[using].run_on_commit[start:]:
+        callback()
+
+
+class QueryBudgetMixin:
+    """Проверка бюджета запросов, объявленного через ``@query_budget``."""
+
+    def assertQueryBudget(self, client, url):
+        view = resolve(url.split('?')[0]).func
+        budget = getattr(view, 'query_budget', None)
+        self.assertIsNotNone(
+            budget, f'Для {url} не объявлен бюджет запросов')
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+        self.assertLessEqual(
+            len(queries), budget,
+            f'{url}: {len(queries)} запросов при бюджете {budget}:\n'
+            + '\n'.join(query['sql'] for query in queries.captured_queries),
+        )
+        return response
+
+
+class TestRunner(DiscoverRunner):
+    """Тесты с общим кешем и блокировками во временном каталоге.
+
+    Иначе ``cache.clear()`` в тестах стирал бы кеш запущенного локально
+    сервера, а тесты читали бы оставленные им записи.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.temp_dir = tempfile.mkdtemp(prefix='yatube-tests-')
+        caches = copy.deepcopy(settings.CACHES)
+        caches['shared']['LOCATION'] = os.path.join(self.temp_dir, 'cache')
+        self.temp_settings = override_settings(
+            CACHES=caches, LOCKS_DIR=os.path.join(self.temp_dir, 'locks'))
+        self.temp_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.temp_settings.disable()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,66 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+User = get_user_model()
+
+
+class CachedAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            'reader', password='old-password', first_name='Читатель')
+        self.client.login(username='reader', password='old-password')
+        self.url = reverse('about:author')
+
+    def auth_queries(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url)
+        self.assertEqual(response.wsgi_request.user, self.user)
+        return [
+            query['sql'] for query in context.captured_queries
+            if 'django_session' in query['sql'] or 'auth_user' in query['sql']
+        ]
+
+    def test_session_and_user_come_from_cache(self):
+        '''Со второго запроса ни сессия, ни пользователь не читаются из БД.'''
+        self.auth_queries()
+        self.assertEqual(self.auth_queries(), [])
+
+    def test_snapshot_user_is_safe_to_save(self):
+        '''Пользователь из снимка догружает и не затирает пароль.'''
+        self.auth_queries()
+        user = self.client.get(self.url).wsgi_request.user
+        self.assertEqual(user.first_name, 'Читатель')
+        user.first_name = 'Писатель'
+        user.save()
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('old-password'))
+        self.assertEqual(self.user.first_name, 'Писатель')
+        self.assertEqual(
+            self.client.get(self.url).wsgi_request.user.first_name,
+            'Писатель')
+
+    def test_password_change_invalidates_other_sessions(self):
+        '''После смены пароля другие сессии разлогинены, текущая — нет.'''
+        other = self.client_class()
+        other.login(username='reader', password='old-password')
+        other.get(self.url)
+        self.client.post(reverse('users:password_change'), {
+            'old_password': 'old-password',
+            'new_password1': 'new-Passw0rd!',
+            'new_password2': 'new-Passw0rd!',
+        })
+        self.assertTrue(
+            self.client.get(self.url).wsgi_request.user.is_authenticated)
+        self.assertFalse(
+            other.get(self.url).wsgi_request.user.is_authenticated)
+
+    def test_logout(self):
+        self.auth_queries()
+        self.client.get(reverse('users:logout'))
+        self.assertFalse(
+            self.client.get(self.url).wsgi_request.user.is_authenticated)
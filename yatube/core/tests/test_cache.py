@@ -0,0 +1,68 @@
+import os
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+
+from ..cache import TwoTierCache
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'test-shared': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'test-shared',
+    },
+}
+
+
+@override_settings(CACHES=CACHES)
+class TwoTierCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.cache = TwoTierCache('test-shared', {'OPTIONS': {
+            'L1_MAX_ENTRIES': 2,
+            'L1_TIMEOUT': 5,
+            'L1_BYPASS_PREFIXES': ['version:'],
+        }})
+        self.cache.clear()
+        self.shared = caches['test-shared']
+
+    def test_l1_serves_recent_values(self):
+        '''Недавно прочитанное значение отдаётся из памяти процесса.'''
+        self.cache.set('page', 'L1')
+        self.shared.set('page', 'L2')
+        self.assertEqual(self.cache.get('page'), 'L1')
+
+    def test_l1_entries_expire(self):
+        '''Запись в L1 живёт не дольше L1_TIMEOUT.'''
+        self.cache.set('page', 'old')
+        self.shared.set('page', 'new')
+        with mock.patch('core.cache.time.monotonic', return_value=1e12):
+            self.assertEqual(self.cache.get('page'), 'new')
+
+    def test_l1_is_bounded(self):
+        '''L1 вытесняет давно не использованные записи.'''
+        for key in ('a', 'b', 'c'):
+            self.cache.set(key, key)
+        self.shared.delete_many(['a', 'b', 'c'])
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(self.cache.get_many(['b', 'c']), {'b': 'b', 'c': 'c'})
+
+    def test_version_stamps_bypass_l1(self):
+        '''Версии читаются из общего кеша, минуя L1.'''
+        self.cache.set('version:index', 1)
+        self.shared.incr('version:index')
+        self.assertEqual(self.cache.get('version:index'), 2)
+        self.assertEqual(self.cache.incr('version:index'), 3)
+
+
+class TestRunnerTests(SimpleTestCase):
+    def test_tests_do_not_use_local_cache(self):
+        '''Тесты не трогают кеш и блокировки локального сервера.'''
+        self.assertNotEqual(
+            caches['shared']._dir,
+            os.path.join(settings.BASE_DIR, '.django_cache'))
+        self.assertNotEqual(
+            settings.LOCKS_DIR, os.path.join(settings.BASE_DIR, '.locks'))
@@ -0,0 +1,108 @@
+import os
+import sqlite3
+import tempfile
+import time
+from types import SimpleNamespace
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from posts.cache import bump, versioned_cache_page
+from posts.models import Post
+
+from .. import db_router
+from ..management.commands.sync_replicas import copy_database
+from ..middleware import ReplicaStickinessMiddleware
+
+REPLICAS = ['replica1', 'replica2']
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS, REPLICA_STICKY_SECONDS=5)
+class PrimaryReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = db_router.PrimaryReplicaRouter()
+        db_router.reset()
+        self.addCleanup(db_router.reset)
+
+    def request(self, view, **cookies):
+        request = RequestFactory().get('/')
+        request.COOKIES.update(cookies)
+        return ReplicaStickinessMiddleware(view)(request)
+
+    def test_reads_go_to_replicas_until_write(self):
+        '''Чтения — на реплики, после записи — только в основную базу.'''
+        self.assertIn(self.router.db_for_read(Post), REPLICAS)
+        self.assertEqual(self.router.db_for_write(Post), 'default')
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_writer_sticks_to_primary(self):
+        '''После записи запросы пользователя читают из основной базы.'''
+        def write(request):
+            self.router.db_for_write(Post)
+            return HttpResponse()
+
+        def read(request):
+            return HttpResponse(self.router.db_for_read(Post))
+
+        self.assertIn(self.request(read).content.decode(), REPLICAS)
+        self.assertNotIn('yatube_primary', self.request(read).cookies)
+        written = self.request(write).cookies['yatube_primary'].value
+        self.assertEqual(
+            self.request(read, yatube_primary=written).content, b'default')
+        expired = str(time.time() - 10)
+        self.assertIn(
+            self.request(read, yatube_primary=expired).content.decode(),
+            REPLICAS)
+
+    @override_settings(REPLICA_MAX_LAG=2)
+    def test_fresh_pages_are_rendered_from_primary(self):
+        '''Страница для кеша не читает реплику, отстающую от версий.
+
+        Страницы, изменённые раньше, чем реплика могла отстать, читаются
+        с реплик.
+        '''
+        @versioned_cache_page('index')
+        def view(request):
+            return HttpResponse(self.router.db_for_read(Post))
+
+        cache.clear()
+        users = [AnonymousUser(), SimpleNamespace(is_authenticated=True, pk=1)]
+        old = int((time.time() - 3) * 1000)
+        for user in users:
+            with self.subTest(user=user):
+                bump('index')
+                db_router.reset()
+                request = RequestFactory().get('/')
+                request.user = user
+                self.assertEqual(view(request).content, b'default')
+                cache.set('scope-version:index', old, None)
+                db_router.reset()
+                self.assertIn(view(request).content.decode(), REPLICAS)
+                old += 1
+
+    def test_replicas_are_not_migrated(self):
+        self.assertFalse(self.router.allow_migrate('replica1', 'posts'))
+        self.assertIsNone(self.router.allow_migrate('default', 'posts'))
+
+
+class SyncReplicasTests(SimpleTestCase):
+    def test_copy_database(self):
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, 'primary.sqlite3')
+            target = os.path.join(directory, 'replica.sqlite3')
+            with sqlite3.connect(source) as database:
+                database.execute('CREATE TABLE post (text)')
+                database.execute("INSERT INTO post VALUES ('новый')")
+            copy_database(source, target)
+            with sqlite3.connect(target) as database:
+                rows = database.execute('SELECT text FROM post').fetchall()
+            self.assertEqual(rows, [('новый',)])
+
+    @override_settings(DATABASE_REPLICAS=REPLICAS, REPLICA_MAX_LAG=2)
+    def test_lag_is_limited(self):
+        '''Отставание не больше того, на которое рассчитана липкость.'''
+        with self.assertRaises(CommandError):
+            call_command('sync_replicas', '--lag=3')
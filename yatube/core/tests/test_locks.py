@@ -0,0 +1,47 @@
+import os
+import time
+
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+
+from .. import locks
+
+
+class LockTests(SimpleTestCase):
+    def setUp(self):
+        self.addCleanup(locks.release, 'test-lock')
+
+    def test_lock_is_taken_once(self):
+        self.assertTrue(locks.acquire('test-lock', 30))
+        self.assertFalse(locks.acquire('test-lock', 30))
+        locks.release('test-lock')
+        self.assertTrue(locks.acquire('test-lock', 30))
+
+    def test_abandoned_lock_is_taken_over(self):
+        '''Блокировку старше срока забирает новый претендент.'''
+        self.assertTrue(locks.acquire('test-lock', 30))
+        old = time.time() - 60
+        os.utime(locks._path('test-lock'), (old, old))
+        self.assertTrue(locks.acquire('test-lock', 30))
+        self.assertFalse(locks.acquire('test-lock', 30))
+
+
+class CacheLockTests(SimpleTestCase):
+    def setUp(self):
+        caches = dict(settings.CACHES, locks={
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'locks',
+        })
+        override = override_settings(CACHES=caches, LOCKS_CACHE='locks')
+        override.enable()
+        self.addCleanup(override.disable)
+        self.addCleanup(locks.release, 'test-lock')
+
+    def test_atomic_cache_holds_lock(self):
+        '''С атомарным add блокировка берётся в кеше, без файлов.'''
+        self.assertTrue(locks.acquire('test-lock', 30))
+        self.assertFalse(locks.acquire('test-lock', 30))
+        self.assertTrue(locks.is_locked('test-lock'))
+        self.assertFalse(os.path.exists(locks._path('test-lock')))
+        locks.release('test-lock')
+        self.assertFalse(locks.is_locked('test-lock'))
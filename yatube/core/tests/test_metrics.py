@@ -0,0 +1,79 @@
+import os
+import pickle
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import metrics
+
+METRICS_DIR = tempfile.mkdtemp()
+
+
+@override_settings(METRICS_DIR=METRICS_DIR, METRICS_FLUSH_INTERVAL=0)
+class MetricsTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(METRICS_DIR, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        metrics.registry.clear()
+        for name in os.listdir(METRICS_DIR):
+            os.remove(os.path.join(METRICS_DIR, name))
+
+    def test_requests_are_measured_per_url_name(self):
+        '''Время, запросы к БД, шаблоны и кеш страницы — по имени адреса.'''
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        text = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn(
+            'yatube_requests_total{method="GET",status="200",'
+            'view="posts:index"} 2', text)
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="posts:index"} 2',
+            text)
+        self.assertIn(
+            'yatube_db_queries_bucket{view="posts:index",le="+Inf"} 2', text)
+        self.assertIn(
+            'yatube_template_render_seconds_count'
+            '{template="posts/index.html"} 1', text)
+        self.assertIn(
+            'yatube_page_cache_total{result="hit",view="index"} 1', text)
+        self.assertIn(
+            'yatube_page_cache_total{result="miss",view="index"} 1', text)
+
+    def test_processes_are_aggregated(self):
+        '''Снимки других процессов складываются с текущим.'''
+        metrics.inc('yatube_requests_total', view='posts:index')
+        metrics.observe('yatube_db_queries', 2, view='posts:index')
+        other = metrics.Registry()
+        other.inc('yatube_requests_total', 2, view='posts:index')
+        other.observe('yatube_db_queries', 40, view='posts:index')
+        with open(os.path.join(METRICS_DIR, '1.pickle'), 'wb') as file:
+            pickle.dump(other.snapshot(), file)
+
+        text = metrics.render(metrics.collect())
+        self.assertIn('yatube_requests_total{view="posts:index"} 3', text)
+        self.assertIn(
+            'yatube_db_queries_bucket{view="posts:index",le="3"} 1', text)
+        self.assertIn(
+            'yatube_db_queries_bucket{view="posts:index",le="55"} 2', text)
+        self.assertIn('yatube_db_queries_sum{view="posts:index"} 42', text)
+
+    def test_snapshot_is_flushed_to_file(self):
+        metrics.inc('yatube_requests_total', view='posts:index')
+        metrics.registry.maybe_flush()
+        path = os.path.join(METRICS_DIR, f'{os.getpid()}.pickle')
+        with open(path, 'rb') as file:
+            self.assertEqual(pickle.load(file), metrics.registry.snapshot())
+
+    def test_endpoint_is_limited_to_allowed_addresses(self):
+        url = reverse('metrics')
+        self.assertEqual(
+            self.client.get(url, REMOTE_ADDR='10.0.0.1').status_code, 403)
+        response = self.client.get(url)
+        self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE)
@@ -0,0 +1,89 @@
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.utils.functional import SimpleLazyObject
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from .. import profiling
+
+User = get_user_model()
+PROFILING_DIR = tempfile.mkdtemp()
+
+
+@override_settings(PROFILING_DIR=PROFILING_DIR, PROFILING_MAX_FILES=2)
+class ProfilingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('staff', is_staff=True)
+        cls.user = User.objects.create_user('user')
+
+    def setUp(self):
+        shutil.rmtree(PROFILING_DIR, ignore_errors=True)
+        self.client.force_login(self.staff)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(PROFILING_DIR, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_staff_token_profiles_request(self):
+        '''Запрос с токеном сотрудника профилируется, без токена — нет.'''
+        url = reverse('posts:index')
+        self.client.get(url)
+        self.assertEqual(profiling.profiles(), [])
+
+        response = self.client.get(
+            url, HTTP_X_YATUBE_PROFILE=profiling.make_token(self.staff))
+        profile, = profiling.profiles()
+        self.assertEqual(profile['name'], response['X-Yatube-Profile-Id'])
+        self.assertEqual(profile['view'], 'posts:index')
+        self.assertEqual(profile['user'], 'staff')
+        self.assertIn('posts/cache.py', profiling.summary(profile['name']))
+
+    def test_user_is_not_loaded_without_token(self):
+        '''Без токена сессия и пользователь не читаются.'''
+        def load_user():
+            raise AssertionError('пользователь загружен')
+
+        request = RequestFactory().get('/')
+        request.user = SimpleLazyObject(load_user)
+        self.assertFalse(profiling.is_requested(request))
+
+    def test_token_of_other_user_is_ignored(self):
+        self.client.force_login(self.user)
+        self.client.get(
+            reverse('posts:index'),
+            HTTP_X_YATUBE_PROFILE=profiling.make_token(self.staff))
+        self.assertEqual(profiling.profiles(), [])
+
+    @override_settings(PROFILING_SAMPLE_RATE=1)
+    def test_sampling_keeps_ring_buffer_bounded(self):
+        '''Хранятся только последние PROFILING_MAX_FILES профилей.'''
+        self.client.logout()
+        for _ in range(3):
+            self.client.get(reverse('posts:index'))
+        profiles = profiling.profiles()
+        self.assertEqual(len(profiles), 2)
+        self.assertEqual(profiles[0]['trigger'], 'sample')
+        self.assertIsNone(profiles[0]['user'])
+
+    def test_staff_pages(self):
+        '''Сотрудник включает профилирование куками и скачивает профили.'''
+        self.client.post(reverse('core:profile_toggle'))
+        self.client.get(reverse('posts:index'))
+        response = self.client.get(reverse('core:profile_list'))
+        self.assertTrue(response.context['enabled'])
+        name = response.context['profiles'][0]['name']
+        download = self.client.get(
+            reverse('core:profile_download', args=[name]))
+        self.assertEqual(download.status_code, 200)
+        self.assertEqual(
+            self.client.get(
+                reverse('core:profile_summary', args=['..'])).status_code,
+            404)
+
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('core:profile_list'))
+        self.assertEqual(response.status_code, 302)
@@ -0,0 +1,87 @@
+import gzip
+import os
+import shutil
+import tempfile
+
+import brotli
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import SimpleTestCase, override_settings
+
+from ..views import accepted_encodings
+
+STATIC_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(STATIC_ROOT=STATIC_ROOT)
+class StaticFilesTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(STATIC_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.css = staticfiles_storage.stored_name('css/bootstrap.min.css')
+
+    def test_static_tag_uses_hashed_names(self):
+        '''{% static %} выводит имя с хешем содержимого.'''
+        url = Template(
+            "{% load static %}{% static 'css/bootstrap.min.css' %}"
+        ).render(Context())
+        self.assertRegex(
+            url, r'^/static/css/bootstrap\.min\.[0-9a-f]{12}\.css$')
+
+    def test_collectstatic_writes_gzip_copies(self):
+        '''Текстовые файлы получают сжатые копии, картинки — нет.'''
+        path = os.path.join(STATIC_ROOT, self.css)
+        with open(path, 'rb') as original, gzip.open(path + '.gz') as copy:
+            self.assertEqual(copy.read(), original.read())
+        logo = staticfiles_storage.stored_name('img/logo.png')
+        self.assertFalse(
+            os.path.exists(os.path.join(STATIC_ROOT, logo + '.gz')))
+
+    def test_collectstatic_writes_brotli_copies(self):
+        path = os.path.join(STATIC_ROOT, self.css)
+        with open(path, 'rb') as original, open(path + '.br', 'rb') as copy:
+            self.assertEqual(brotli.decompress(copy.read()), original.read())
+        response = self.client.get(
+            f'/static/{self.css}', HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+
+    def test_not_modified_keeps_cache_headers(self):
+        '''Ответ 304 несёт те же Cache-Control и Vary, что и 200.'''
+        url = f'/static/{self.css}'
+        response = self.client.get(url)
+        not_modified = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(not_modified.status_code, 304)
+        for header in ('Cache-Control', 'Vary', 'Last-Modified'):
+            self.assertEqual(not_modified[header], response[header])
+
+    def test_serving_picks_encoding_and_caches_forever(self):
+        '''Копия по Accept-Encoding; имена с хешем — immutable.'''
+        response = self.client.get(
+            f'/static/{self.css}', HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+        response = self.client.get(
+            f'/static/{self.css}', HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+        response = self.client.get('/static/css/bootstrap.min.css')
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertEqual(
+            self.client.get('/static/../settings.py').status_code, 404)
+
+    def test_accepted_encodings(self):
+        self.assertEqual(
+            accepted_encodings('br;q=1.0, gzip;q=0, *'), {'br', '*'})
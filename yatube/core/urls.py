@@ -0,0 +1,16 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'core'
+
+urlpatterns = [
+    path('', views.profile_list, name='profile_list'),
+    path('toggle/', views.profile_toggle, name='profile_toggle'),
+    path('<str:name>/', views.profile_summary, name='profile_summary'),
+    path(
+        '<str:name>/download/',
+        views.profile_download,
+        name='profile_download'
+    ),
+]
@@ -1,4 +1,20 @@
-from django.shortcuts import render
+import mimetypes
+import os
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import PermissionDenied, SuspiciousFileOperation
+from django.http import (FileResponse, Http404, HttpResponse,
+                         HttpResponseNotModified)
+from django.shortcuts import redirect, render
+from django.utils._os import safe_join
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+from django.views.decorators.http import require_POST
+from django.views.static import was_modified_since
+
+from . import metrics, profiling
 
 
 def csrf_failure(request, reason=''):
@@ -9,3 +25,134 @@ def page_not_found(request, exception):
     # Переменная exception содержит отладочную информацию;
     # выводить её в шаблон пользовательской страницы 404 мы не станем
     return render(request, 'core/404.html', {'path': request.path}, status=404)
+
+
+def metrics_view(request):
+    """Метрики всех процессов для Prometheus."""
+    allowed = settings.METRICS_ALLOWED_IPS
+    if allowed and request.META.get('REMOTE_ADDR') not in allowed:
+        raise PermissionDenied
+    return HttpResponse(
+        metrics.render(metrics.collect()), content_type=metrics.CONTENT_TYPE)
+
+
+@staff_member_required
+def profile_list(request):
+    """Сохранённые профили и переключатель профилирования своих запросов."""
+    return render(request, 'core/profiles.html', {
+        'profiles': profiling.profiles(),
+        'enabled': profiling.is_requested(request),
+        'token': profiling.make_token(request.user),
+        'header': 'X-Yatube-Profile',
+        'sample_rate': settings.PROFILING_SAMPLE_RATE,
+    })
+
+
+@staff_member_required
+@require_POST
+def profile_toggle(request):
+    response = redirect('core:profile_list')
+    if profiling.is_requested(request):
+        response.delete_cookie(profiling.COOKIE_NAME)
+    else:
+        response.set_cookie(
+            profiling.COOKIE_NAME, profiling.make_token(request.user),
+            max_age=settings.PROFILING_TOKEN_AGE, httponly=True,
+            samesite='Lax',
+        )
+    return response
+
+
+def _profile_path(name, extension='.prof'):
+    try:
+        path = profiling.profile_path(name, extension)
+    except ValueError:
+        raise Http404
+    if not os.path.exists(path):
+        raise Http404
+    return path
+
+
+@staff_member_required
+def profile_download(request, name):
+    """Файл для ``pstats``, snakeviz и подобных инструментов."""
+    return FileResponse(
+        open(_profile_path(name), 'rb'), as_attachment=True,
+        filename=f'{name}.prof',
+    )
+
+
+@staff_member_required
+def profile_summary(request, name):
+    _profile_path(name)
+    return HttpResponse(
+        profiling.summary(name),
+        content_type='text/plain; charset=utf-8',
+    )
+
+
+# Кодировки в порядке предпочтения и расширения их копий (core.storage).
+STATIC_ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+STATIC_MAX_AGE = 60 * 60 * 24 * 365
+
+
+def accepted_encodings(header):
+    """Кодировки из ``Accept-Encoding``, кроме запрещённых ``q=0``."""
+    accepted = set()
+    for part in header.split(','):
+        coding, _, params = part.partition(';')
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                if float(params[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def serve_static(request, path):
+    """Собранная статика; сжатая копия выбирается по ``Accept-Encoding``.
+
+    Файлы с хешем в имени кешируются навсегда (``immutable``), остальные
+    браузер переспрашивает.
+    """
+    try:
+        full_path = safe_join(settings.STATIC_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+    stat = os.stat(full_path)
+    if not was_modified_since(
+            request.META.get('HTTP_IF_MODIFIED_SINCE'),
+            stat.st_mtime, stat.st_size):
+        return _static_headers(HttpResponseNotModified(), path, stat)
+    accepted = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    encoding = None
+    for coding, extension in STATIC_ENCODINGS:
+        if coding in accepted and os.path.isfile(full_path + extension):
+            encoding = coding
+            full_path += extension
+            break
+    content_type, _ = mimetypes.guess_type(path)
+    response = FileResponse(
+        open(full_path, 'rb'),
+        content_type=content_type or 'application/octet-stream',
+    )
+    if encoding:
+        response['Content-Encoding'] = encoding
+    return _static_headers(response, path, stat)
+
+
+def _static_headers(response, path, stat):
+    """Заголовки кеширования статики, одинаковые для 200 и 304."""
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    patch_vary_headers(response, ['Accept-Encoding'])
+    if staticfiles_storage.is_hashed(path):
+        patch_cache_control(
+            response, public=True, max_age=STATIC_MAX_AGE, immutable=True)
+    else:
+        patch_cache_control(response, public=True, no_cache=True)
+    return response
@@ -2,6 +2,7 @@ from email.headerregistry import Group
 
 from django.contrib import admin
 
+from . import search
 from .models import Group, Post
 
 
@@ -14,6 +15,12 @@ class PostAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
     list_editable = ('group',)
 
+    def get_search_results(self, request, queryset, search_term):
+        """Поиск по индексу FTS5 вместо ``LIKE '%...%'``."""
+        if not search_term:
+            return queryset, False
+        return search.filter_posts(queryset, search_term), False
+
 
 class GroupAdmin(admin.ModelAdmin):
     """Создаем админ зону для групп."""
@@ -0,0 +1,322 @@
+"""Кеш страниц с версиями областей.
+
+Страница зависит от областей (scope): ``index``, ``group:<slug>``,
+``author:<username>``. В ключ страницы входят текущие версии её
+областей, а сохранение или удаление поста увеличивает версии своих
+областей. Поэтому закешированная страница живёт до первого изменения,
+а не фиксированные 20 секунд, и новые посты видны сразу.
+
+Карточки постов кешируются отдельно: ключ карточки строится по id поста
+и хешу всех данных, которые в неё выводятся, так что устаревшая карточка
+просто перестаёт запрашиваться.
+"""
+import hashlib
+import random
+import time
+from functools import partial, wraps
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import get_template
+from django.utils.http import http_date
+from django.utils.safestring import mark_safe
+
+from core import db_router, locks
+from core import holes as core_holes
+from core import metrics
+
+VERSION_KEY = 'scope-version:{}'
+ANON_PAGE_KEY = 'anon-page:{}'
+ANON_LOCK_KEY = 'anon-page-lock:{}'
+ANON_WAIT_STEP = 0.02
+
+
+def _version_key(scope):
+    # Слаги и имена бывают не ASCII, а ключи memcached — только ASCII.
+    return VERSION_KEY.format(quote(scope))
+
+
+def _initial_version():
+    # Версия, потерянная при вытеснении из кеша, не должна повториться.
+    return int(time.time() * 1000)
+
+
+def version_time(versions):
+    """Время последнего изменения областей (Unix-время в секундах).
+
+    Версия — это время изменения в миллисекундах (или больше него на
+    число изменений за ту же миллисекунду), поэтому из неё получается
+    ``Last-Modified`` без запросов к базе.
+    """
+    return max(versions) // 1000
+
+
+def get_versions(scopes):
+    """Текущие версии областей одним запросом к кешу."""
+    keys = [_version_key(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _initial_version(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump(*scopes):
+    """Сделать недействительными страницы перечисленных областей."""
+    now = _initial_version()
+    for scope in scopes:
+        key = _version_key(scope)
+        try:
+            version = cache.incr(key)
+        except ValueError:
+            version = 0
+        if version < now:
+            cache.set(key, now, None)
+
+
+def post_scopes(post):
+    """Области, на страницах которых показывается пост."""
+    scopes = ['index', f'author:{post.author.username}', f'post:{post.pk}']
+    if post.group_id is not None:
+        scopes.append(f'group:{post.group.slug}')
+    return scopes
+
+
+def page_etag(request, versions):
+    """Слабый ETag: страница персональна и зависит от адреса."""
+    user_id = request.user.pk if request.user.is_authenticated else 0
+    raw = f'{request.get_full_path()}|{user_id}|{versions}'
+    return 'W/"%s"' % hashlib.md5(raw.encode()).hexdigest()
+
+
+def page_key(request, versions, shared=False):
+    """Ключ страницы; ``shared`` — одна копия на всех пользователей."""
+    user_id = request.user.pk if request.user.is_authenticated else 0
+    if shared:
+        user_id = 'holes'
+    raw = f'{request.get_full_path()}|{user_id}|{versions}'
+    return 'versioned-page:' + hashlib.md5(raw.encode()).hexdigest()
+
+
+def scope_names(request, scopes, kwargs, lookup=None):
+    """Области страницы по аргументам представления.
+
+    Недостающие значения даёт ``lookup(**kwargs)``; его результат
+    запоминается в запросе, чтобы декораторы не повторяли запрос к базе.
+    ``None`` — объекта нет.
+    """
+    params = dict(kwargs)
+    if lookup is not None:
+        if not hasattr(request, '_scope_lookup'):
+            request._scope_lookup = lookup(**kwargs)
+        if request._scope_lookup is None:
+            return None
+        params.update(request._scope_lookup)
+    return [scope.format(**params) for scope in scopes]
+
+
+def render_primary(render, versions):
+    """Рендер страницы, которая попадёт в кеш.
+
+    Версии областей меняются сразу после записи, а реплика может ещё
+    не получить её; прочитанное с реплики сохранилось бы под новой
+    версией и отдавалось бы до следующего изменения. Поэтому страницу,
+    изменённую меньше ``REPLICA_MAX_LAG`` секунд назад, читаем из
+    основной базы, остальные — с реплики.
+    """
+    if time.time() - max(versions) / 1000 < settings.REPLICA_MAX_LAG:
+        db_router.pin()
+    return render()
+
+
+def _cacheable(response):
+    return (response.status_code == 200 and not response.streaming
+            and not response.cookies)
+
+
+def anonymous_page(request, versions, render, name):
+    """Страница для анонимов: одна перестройка и устаревшая копия.
+
+    Копия хранится по адресу вместе с версиями областей и сроком
+    свежести со случайным разбросом (``ANON_PAGE_JITTER``), чтобы копии
+    разных страниц не устаревали разом. Когда копия устарела, страницу
+    перестраивает один запрос — тот, кто взял блокировку
+    (``core.locks``); прочие тем временем получают устаревшую копию.
+    Если копии нет вовсе, они не дольше ``ANON_PAGE_WAIT`` ждут, пока
+    её построят, и строят страницу сами, если блокировку сняли без копии.
+    """
+    digest = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    key = ANON_PAGE_KEY.format(digest)
+    lock = ANON_LOCK_KEY.format(digest)
+    entry = cache.get(key)
+    if _is_fresh(entry, versions):
+        metrics.inc('yatube_page_cache_total', view=name, result='hit')
+        return entry[2]
+    if locks.acquire(lock, settings.ANON_PAGE_LOCK_TIMEOUT):
+        try:
+            # Пока мы читали копию, её мог построить и отпустить
+            # блокировку другой запрос.
+            entry = cache.get(key)
+            if _is_fresh(entry, versions):
+                metrics.inc(
+                    'yatube_page_cache_total', view=name, result='hit')
+                return entry[2]
+            metrics.inc('yatube_page_cache_total', view=name, result='miss')
+            response = render_primary(render, versions)
+            if _cacheable(response):
+                _store_anonymous(request, key, versions, response)
+        finally:
+            locks.release(lock)
+        return response
+    if entry is not None:
+        metrics.inc('yatube_page_cache_total', view=name, result='stale')
+        return entry[2]
+    response = _wait_anonymous(key, lock, versions)
+    metrics.inc(
+        'yatube_page_cache_total', view=name,
+        result='miss' if response is None else 'hit',
+    )
+    return render() if response is None else response
+
+
+def _is_fresh(entry, versions):
+    return (entry is not None and entry[0] == versions
+            and entry[1] > time.time())
+
+
+def _wait_anonymous(key, lock, versions):
+    """Копия, которую строит другой запрос, или ``None``."""
+    deadline = time.monotonic() + settings.ANON_PAGE_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(ANON_WAIT_STEP)
+        # Блокировку проверяем до чтения копии: её сохраняют до снятия.
+        locked = locks.is_locked(lock)
+        entry = cache.get(key)
+        if entry is not None and entry[0] == versions:
+            return entry[2]
+        if not locked:
+            return None
+    return None
+
+
+def _store_anonymous(request, key, versions, response):
+    # Устаревшую копию отдают, пока страницу перестраивают: валидаторы
+    # должны описывать её версии, а не текущие (их проставил бы
+    # ``conditional_page``), иначе клиент получал бы на неё 304.
+    response['ETag'] = page_etag(request, versions)
+    response['Last-Modified'] = http_date(version_time(versions))
+    jitter = settings.ANON_PAGE_JITTER
+    ttl = settings.ANON_PAGE_TTL * random.uniform(1 - jitter, 1 + jitter)
+    cache.set(
+        key, (versions, time.time() + ttl, response),
+        ttl + settings.ANON_PAGE_STALE_TTL,
+    )
+
+
+def user_page(request, versions, render, name, holes, timeout):
+    """Страница для вошедших пользователей.
+
+    С ``holes`` страница рендерится с метками вместо персональных
+    фрагментов (см. ``core.holes``) и хранится одна на всех; фрагменты
+    подставляются в каждый ответ. Иначе у каждого пользователя своя
+    копия.
+    """
+    key = page_key(request, versions, shared=holes)
+    response = cache.get(key)
+    metrics.inc(
+        'yatube_page_cache_total', view=name,
+        result='miss' if response is None else 'hit',
+    )
+    if response is None:
+        request.punch_holes = holes
+        response = render_primary(render, versions)
+        if _cacheable(response):
+            cache.set(key, response, timeout or settings.PAGE_CACHE_TIMEOUT)
+    if holes:
+        response = core_holes.splice(request, response)
+    return response
+
+
+def versioned_cache_page(*scopes, timeout=None, lookup=None,
+                         authenticated=True, holes=False):
+    """Кеширует GET-ответ представления до изменения его областей.
+
+    Области задаются шаблонами, в которые подставляются аргументы
+    представления: ``@versioned_cache_page('group:{slug}')``; значения,
+    которых нет в аргументах, даёт ``lookup`` (как в
+    ``conditional_page``). Анонимам страница отдаётся через
+    ``anonymous_page``, пользователям — через ``user_page``.
+    ``holes=True`` — все персональные элементы страницы вынесены в
+    ``{% hole %}``, и пользователи делят одну копию.
+    ``authenticated=False`` отключает для них кеш (например, если на
+    странице есть форма с CSRF-токеном).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            is_authenticated = request.user.is_authenticated
+            if is_authenticated and not authenticated:
+                return view(request, *args, **kwargs)
+            names = scope_names(request, scopes, kwargs, lookup)
+            if names is None:
+                return view(request, *args, **kwargs)
+            versions = get_versions(names)
+            render = partial(view, request, *args, **kwargs)
+            if not is_authenticated:
+                return anonymous_page(
+                    request, versions, render, view.__name__)
+            return user_page(
+                request, versions, render, view.__name__, holes, timeout)
+        return wrapper
+    return decorator
+
+
+def card_key(post, template_name):
+    """Ключ карточки: id поста и версия её содержимого."""
+    group = post.group
+    content = '|'.join(str(value) for value in (
+        template_name,
+        post.text,
+        post.pub_date.isoformat(),
+        post.image.name,
+        post.author.username,
+        post.author.first_name,
+        post.author.last_name,
+        group.slug if group else '',
+        group.title if group else '',
+    ))
+    version = hashlib.md5(content.encode()).hexdigest()
+    return f'post-card:{post.pk}:{version}'
+
+
+def render_cards(posts, template_name, prepare=None):
+    """Карточки постов страницы.
+
+    Все карточки читаются из кеша одним ``get_many``, рендерятся только
+    промахи, и они же сохраняются одним ``set_many``. Перед рендером
+    промахи передаются в ``prepare`` одним списком. Карточки с
+    заглушкой вместо миниатюры не кешируются.
+    """
+    posts = list(posts)
+    keys = [card_key(post, template_name) for post in posts]
+    cards = cache.get_many(keys)
+    misses = [
+        (post, key) for post, key in zip(posts, keys) if key not in cards]
+    if misses and prepare is not None:
+        prepare([post for post, key in misses])
+    template = get_template(template_name)
+    rendered = {}
+    for post, key in misses:
+        card = template.render({'post': post})
+        if getattr(post, 'thumbnail_pending', False):
+            cards[key] = card
+        else:
+            rendered[key] = card
+    if rendered:
+        cache.set_many(rendered, settings.CARD_CACHE_TIMEOUT)
+        cards.update(rendered)
+    return [mark_safe(cards[key]) for key in keys]
@@ -0,0 +1,70 @@
+"""Условные GET-запросы (``ETag`` и ``Last-Modified``) по версиям областей.
+
+Валидаторы страницы строятся из версий её областей в кеше (см.
+``posts.cache``): версии меняются при каждом новом посте, правке,
+комментарии, подписке или изменении группы, а сами являются отметками
+времени. Поэтому неизменная страница отвечает ``304`` без рендеринга
+шаблона и почти без запросов к базе.
+"""
+from functools import partial, wraps
+
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from .cache import (get_versions, page_etag, render_primary, scope_names,
+                    version_time)
+from .models import Post
+
+# Области страницы поста; автор и группа берутся из post_scopes_lookup.
+POST_PAGE_SCOPES = ('post:{post_id}', 'author:{username}', 'group:{slug}')
+
+
+def conditional_page(*scopes, lookup=None):
+    """Отвечать ``304``, пока не изменились области страницы.
+
+    Области задаются так же, как в ``versioned_cache_page``. Если для
+    них не хватает аргументов представления, ``lookup(**kwargs)``
+    возвращает недостающие значения одним запросом (или ``None``, если
+    объекта нет — тогда ответ строит само представление).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            names = scope_names(request, scopes, kwargs, lookup)
+            if names is None:
+                return view(request, *args, **kwargs)
+            versions = get_versions(names)
+            etag = page_etag(request, versions)
+            last_modified = version_time(versions)
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified)
+            if response is None:
+                # Ответ получит валидаторы текущих версий: читаем данные
+                # не старее их (см. ``render_primary``).
+                response = render_primary(
+                    partial(view, request, *args, **kwargs), versions)
+            if response.status_code in (200, 304):
+                response.setdefault('ETag', etag)
+                response.setdefault('Last-Modified', http_date(last_modified))
+                # Браузер и прокси всегда переспрашивают; персональные
+                # страницы общим кешам не достаются.
+                patch_cache_control(
+                    response, no_cache=True,
+                    private=request.user.is_authenticated,
+                )
+            return response
+        return wrapper
+    return decorator
+
+
+def post_scopes_lookup(post_id):
+    """Автор и группа поста для областей его страницы."""
+    row = (
+        Post.objects.filter(pk=post_id).order_by()
+        .values_list('author__username', 'group__slug').first()
+    )
+    if row is None:
+        return None
+    return {'username': row[0], 'slug': row[1] or ''}
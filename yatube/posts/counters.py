@@ -0,0 +1,175 @@
+"""Денормализованные счётчики постов, комментариев и подписок.
+
+Счётчики меняются атомарно через ``F()`` в сигналах, а функции
+``recount_*`` пересчитывают их по порциям идентификаторов, чтобы
+исправлять расхождения без долгих блокировок.
+
+Общее число постов на главной хранится в кеше: ключ заполняется одним
+``COUNT(*)`` и дальше сдвигается при создании и удалении постов.
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F
+
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+
+def change(queryset, field, delta):
+    """Атомарно сдвинуть счётчик; в минус он не уходит."""
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    return queryset.update(**{field: F(field) + delta})
+
+
+def change_user(user_id, field, delta):
+    updated = change(UserStats.objects.filter(user_id=user_id), field, delta)
+    if not updated and delta > 0:
+        # Строки ещё нет: создаём её сразу с точными значениями.
+        recount_users([user_id])
+
+
+def change_group(group_id, delta):
+    if group_id is not None:
+        change(Group.objects.filter(pk=group_id), 'posts_count', delta)
+
+
+def change_post(post_id, delta):
+    change(Post.objects.filter(pk=post_id), 'comments_count', delta)
+
+
+TOTAL_POSTS_KEY = 'listing-total:index'
+
+
+def total_posts():
+    """Сколько всего постов: из кеша, а при первом чтении — ``COUNT(*)``.
+
+    Число хранится без срока и дальше только сдвигается сигналами, так
+    что посчитать его один раз точно дешевле, чем жить с оценкой.
+    """
+    total = cache.get(TOTAL_POSTS_KEY)
+    if total is None:
+        total = Post.objects.count()
+        cache.add(TOTAL_POSTS_KEY, total, None)
+    return total
+
+
+def change_total_posts(delta):
+    try:
+        cache.incr(TOTAL_POSTS_KEY, delta)
+    except ValueError:
+        # Ключа нет: число посчитается при следующем чтении.
+        pass
+
+
+def forget_total_posts():
+    cache.delete(TOTAL_POSTS_KEY)
+
+
+def user_stats(user):
+    """Счётчики пользователя; недостающая строка создаётся пересчётом."""
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        recount_users([user.pk])
+        return UserStats.objects.get(user=user)
+
+
+def _grouped_counts(queryset, field, ids):
+    return dict(
+        queryset.filter(**{f'{field}__in': ids})
+        .order_by()
+        .values(field)
+        .annotate(total=Count('pk'))
+        .values_list(field, 'total')
+    )
+
+
+def _sync(model, objects, fields, expected):
+    """Исправить объекты, у которых счётчики расходятся с ``expected``."""
+    changed = []
+    for obj in objects:
+        values = expected(obj.pk)
+        if any(getattr(obj, field) != values[field] for field in fields):
+            for field in fields:
+                setattr(obj, field, values[field])
+            changed.append(obj)
+    if changed:
+        model.objects.bulk_update(changed, fields)
+    return len(changed)
+
+
+def recount_users(user_ids):
+    user_ids = list(user_ids)
+    posts = _grouped_counts(Post.objects, 'author_id', user_ids)
+    followers = _grouped_counts(Follow.objects, 'author_id', user_ids)
+    following = _grouped_counts(Follow.objects, 'user_id', user_ids)
+
+    def expected(user_id):
+        return {
+            'posts_count': posts.get(user_id, 0),
+            'followers_count': followers.get(user_id, 0),
+            'following_count': following.get(user_id, 0),
+        }
+
+    existing = list(UserStats.objects.filter(user_id__in=user_ids))
+    fixed = _sync(UserStats, existing, list(expected(None)), expected)
+    present = {stats.user_id for stats in existing}
+    missing = [
+        UserStats(user_id=user_id, **expected(user_id))
+        for user_id in user_ids if user_id not in present
+    ]
+    UserStats.objects.bulk_create(missing, ignore_conflicts=True)
+    return fixed + len(missing)
+
+
+def recount_posts(post_ids):
+    post_ids = list(post_ids)
+    comments = _grouped_counts(Comment.objects, 'post_id', post_ids)
+    posts = Post.objects.filter(pk__in=post_ids).only('comments_count')
+    return _sync(
+        Post, posts, ['comments_count'],
+        lambda pk: {'comments_count': comments.get(pk, 0)},
+    )
+
+
+def recount_groups(group_ids):
+    group_ids = list(group_ids)
+    posts = _grouped_counts(Post.objects, 'group_id', group_ids)
+    groups = Group.objects.filter(pk__in=group_ids).only('posts_count')
+    return _sync(
+        Group, groups, ['posts_count'],
+        lambda pk: {'posts_count': posts.get(pk, 0)},
+    )
+
+
+def chunked_ids(model, chunk_size):
+    """Первичные ключи таблицы порциями, по возрастанию (keyset)."""
+    last = None
+    while True:
+        queryset = model.objects.order_by('pk')
+        if last is not None:
+            queryset = queryset.filter(pk__gt=last)
+        ids = list(queryset.values_list('pk', flat=True)[:chunk_size])
+        if not ids:
+            return
+        yield ids
+        last = ids[-1]
+
+
+RECOUNTERS = (
+    (User, recount_users),
+    (Post, recount_posts),
+    (Group, recount_groups),
+)
+
+
+def recount_all(chunk_size=1000):
+    """Пересчитать все счётчики; каждая порция — отдельная транзакция."""
+    fixed = {}
+    for model, recount in RECOUNTERS:
+        fixed[model._meta.model_name] = 0
+        for ids in chunked_ids(model, chunk_size):
+            with transaction.atomic():
+                fixed[model._meta.model_name] += recount(ids)
+    forget_total_posts()
+    return fixed
@@ -0,0 +1,113 @@
+"""Потоковая выгрузка постов в формате, который читает ``import_yatube``.
+
+Посты обходятся по первичному ключу порциями (keyset), каждая порция
+читается через ``iterator(chunk_size=...)``, а строки сразу уходят
+в ответ или файл. Поэтому память не растёт с размером выгрузки.
+"""
+import csv
+import json
+import zlib
+
+from .models import Post
+
+FORMATS = {
+    'jsonl': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+CSV_COLUMNS = ('id', 'text', 'pub_date', 'author', 'group', 'image')
+_VALUES = ('pk', 'text', 'pub_date', 'author__username', 'group__slug',
+           'image')
+
+
+def posts_queryset(author=None, group=None):
+    """Посты автора и/или группы (по ``username`` и ``slug``)."""
+    queryset = Post.objects.order_by()
+    if author:
+        queryset = queryset.filter(author__username=author)
+    if group:
+        queryset = queryset.filter(group__slug=group)
+    return queryset
+
+
+def iter_records(queryset, chunk_size=2000):
+    """Записи ``type=post`` по возрастанию id, порциями по ``chunk_size``."""
+    last = 0
+    while True:
+        rows = (
+            queryset.filter(pk__gt=last).order_by('pk')
+            .values_list(*_VALUES)[:chunk_size]
+        )
+        count = 0
+        for pk, text, pub_date, author, group, image in rows.iterator(
+                chunk_size=chunk_size):
+            count += 1
+            last = pk
+            yield {
+                'type': 'post',
+                'id': pk,
+                'text': text,
+                'pub_date': pub_date.isoformat(),
+                'author': author,
+                'group': group,
+                'image': image,
+            }
+        if count < chunk_size:
+            return
+
+
+def jsonl_lines(records):
+    for record in records:
+        yield json.dumps(record, ensure_ascii=False) + '\n'
+
+
+class _Echo:
+    """Буфер для ``csv.writer``, который просто возвращает строку."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(records):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_COLUMNS)
+    for record in records:
+        yield writer.writerow(
+            ['' if record[key] is None else record[key]
+             for key in CSV_COLUMNS])
+
+
+def render(records, export_format):
+    """Строки выгрузки в формате ``jsonl`` или ``csv``."""
+    if export_format == 'csv':
+        return csv_lines(records)
+    return jsonl_lines(records)
+
+
+def gzip_chunks(lines, min_size=64 * 1024):
+    """Сжимать строки на лету в поток gzip.
+
+    Сжатые данные отдаются кусками не меньше ``min_size``, чтобы не
+    посылать клиенту множество мелких фрагментов.
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    buffer = []
+    size = 0
+    for line in lines:
+        data = compressor.compress(line.encode())
+        if data:
+            buffer.append(data)
+            size += len(data)
+        if size >= min_size:
+            yield b''.join(buffer)
+            buffer, size = [], 0
+    buffer.append(compressor.flush())
+    yield b''.join(buffer)
+
+
+def export(queryset, export_format='jsonl', compress=False,
+           chunk_size=2000):
+    """Поток строк (или байтов gzip) выгрузки."""
+    lines = render(iter_records(queryset, chunk_size), export_format)
+    if compress:
+        return gzip_chunks(lines)
+    return (line.encode() for line in lines)
@@ -0,0 +1,245 @@
+"""Материализованная лента подписок (fan-out on write).
+
+Новый пост раскладывается по лентам подписчиков автора, поэтому
+страница ``follow_index`` читается одним диапазоном индекса
+``(user, pub_date, post)``. Посты авторов, у которых подписчиков больше
+``FEED_FANOUT_LIMIT``, не раскладываются, а подмешиваются при чтении.
+"""
+from collections import defaultdict
+from functools import partial
+
+from django.conf import settings
+from django.db import connections, router
+from django.db.models import Q
+
+from .models import FEED_FIELDS, FeedEntry, Follow, Post, UserStats
+
+FEED_ORDERING = ('-pub_date', '-post_id')
+
+
+def followed_celebrities(user):
+    """Авторы из подписок пользователя, чьи посты читаются напрямую."""
+    return list(
+        UserStats.objects
+        .filter(
+            user__following__user=user,
+            followers_count__gt=settings.FEED_FANOUT_LIMIT,
+        )
+        .values_list('user_id', flat=True)
+    )
+
+
+def fan_out(post):
+    """Разложить новый пост по лентам подписчиков автора."""
+    fan_out_many([post])
+
+
+def fan_out_many(posts):
+    """Разложить пачку постов по лентам за несколько запросов.
+
+    Нужно импорту: посты создаются ``bulk_create`` без сигналов.
+    """
+    author_ids = {post.author_id for post in posts}
+    celebrities = set(
+        UserStats.objects.filter(
+            user_id__in=author_ids,
+            followers_count__gt=settings.FEED_FANOUT_LIMIT,
+        ).values_list('user_id', flat=True)
+    )
+    followers = defaultdict(list)
+    follows = Follow.objects.filter(
+        author_id__in=author_ids - celebrities,
+    ).values_list('user_id', 'author_id')
+    for follower_id, author_id in follows:
+        followers[author_id].append(follower_id)
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(
+                user_id=follower_id,
+                post_id=post.pk,
+                author_id=post.author_id,
+                pub_date=post.pub_date,
+            )
+            for post in posts
+            for follower_id in followers[post.author_id]
+        ],
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+    trim({user_id for users in followers.values() for user_id in users})
+
+
+def backfill(user_id, author_id):
+    """Заполнить ленту последними постами автора после подписки."""
+    backfill_many([(user_id, author_id)])
+
+
+BACKFILL_BATCH = 300
+BACKFILL_SQL = (
+    '{insert} {table} (user_id, post_id, author_id, pub_date) '
+    'SELECT pairs.column1, ranked.id, ranked.author_id, ranked.pub_date '
+    'FROM ('
+    'SELECT id, author_id, pub_date, ROW_NUMBER() OVER ('
+    'PARTITION BY author_id ORDER BY pub_date DESC, id DESC'
+    ') AS position FROM {posts} WHERE author_id IN ({authors})'
+    ') ranked JOIN (VALUES {pairs}) pairs '
+    'ON pairs.column2 = ranked.author_id '
+    'WHERE ranked.position <= %s{suffix}'
+)
+
+
+def backfill_many(pairs):
+    """Заполнить ленты после пачки подписок ``(user_id, author_id)``.
+
+    Нужно импорту: на ``BACKFILL_BATCH`` подписок уходит один
+    ``INSERT ... SELECT`` с последними постами каждого автора, а ленты
+    обрезаются один раз в конце. Размер пачки держит число параметров
+    ниже предела SQLite.
+    """
+    pairs = list(pairs)
+    celebrities = set(
+        UserStats.objects.filter(
+            user_id__in={author_id for _, author_id in pairs},
+            followers_count__gt=settings.FEED_FANOUT_LIMIT,
+        ).values_list('user_id', flat=True)
+    )
+    pairs = [pair for pair in pairs if pair[1] not in celebrities]
+    if not pairs:
+        return
+    connection = connections[router.db_for_write(FeedEntry)]
+    if not _supports_window(connection):
+        for user_id, author_id in pairs:
+            _backfill_user(user_id, author_id)
+    else:
+        for start in range(0, len(pairs), BACKFILL_BATCH):
+            _backfill_batch(connection, pairs[start:start + BACKFILL_BATCH])
+    trim({user_id for user_id, _ in pairs})
+
+
+def _backfill_batch(connection, pairs):
+    authors = sorted({author_id for _, author_id in pairs})
+    sql = BACKFILL_SQL.format(
+        insert=connection.ops.insert_statement(ignore_conflicts=True),
+        table=connection.ops.quote_name(FeedEntry._meta.db_table),
+        posts=connection.ops.quote_name(Post._meta.db_table),
+        authors=', '.join(['%s'] * len(authors)),
+        pairs=', '.join(['(%s, %s)'] * len(pairs)),
+        suffix=connection.ops.ignore_conflicts_suffix_sql(
+            ignore_conflicts=True),
+    )
+    params = [*authors, *(value for pair in pairs for value in pair)]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [*params, settings.FEED_DEPTH])
+
+
+def _backfill_user(user_id, author_id):
+    """Заполнить одну ленту, если база не умеет оконные функции."""
+    posts = (
+        Post.objects.filter(author_id=author_id)
+        .order_by('-pub_date', '-id')
+        .values_list('pk', 'pub_date')[:settings.FEED_DEPTH]
+    )
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(
+                user_id=user_id,
+                post_id=post_id,
+                author_id=author_id,
+                pub_date=pub_date,
+            )
+            for post_id, pub_date in posts
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def purge(user_id, author_id):
+    """Убрать из ленты посты автора после отписки."""
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+TRIM_BATCH = 500
+# Для каждой ленты по индексу находим первую лишнюю запись (пропустив
+# FEED_DEPTH свежих) и удаляем её и всё, что старше. У коротких лент
+# такой записи нет, и их записи не удаляются и не перебираются.
+TRIM_SQL = (
+    'DELETE FROM {table} WHERE id IN ('
+    'SELECT entry.id FROM {table} cutoff JOIN {table} entry '
+    'ON entry.user_id = cutoff.user_id '
+    'AND entry.pub_date <= cutoff.pub_date '
+    'AND (entry.pub_date < cutoff.pub_date '
+    'OR entry.post_id <= cutoff.post_id) '
+    'WHERE cutoff.id IN ('
+    'SELECT (SELECT id FROM {table} WHERE user_id = users.column1 '
+    'ORDER BY pub_date DESC, post_id DESC LIMIT 1 OFFSET %s) '
+    'FROM (VALUES {users}) users))'
+)
+
+
+def trim(user_ids):
+    """Обрезать ленты до ``FEED_DEPTH`` самых свежих записей.
+
+    Ленты обрезаются одним ``DELETE`` на ``TRIM_BATCH`` пользователей:
+    ``fan_out`` вызывает это для всех подписчиков автора прямо в запросе,
+    создающем пост. Читаются только первые ``FEED_DEPTH`` записей
+    каждой ленты и лишние записи, а не ленты целиком.
+    """
+    user_ids = list(user_ids)
+    connection = connections[router.db_for_write(FeedEntry)]
+    table = connection.ops.quote_name(FeedEntry._meta.db_table)
+    for start in range(0, len(user_ids), TRIM_BATCH):
+        batch = user_ids[start:start + TRIM_BATCH]
+        users = ', '.join(['(%s)'] * len(batch))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                TRIM_SQL.format(table=table, users=users),
+                [settings.FEED_DEPTH, *batch],
+            )
+
+
+def _supports_window(connection):
+    # Django 2.2 не знает, что SQLite умеет OVER начиная с 3.25.
+    if connection.vendor == 'sqlite':
+        return connection.Database.sqlite_version_info >= (3, 25, 0)
+    return connection.features.supports_over_clause
+
+
+def _post_columns(values, rows):
+    return [
+        {column: row[f'post__{column}'] for column in values} for row in rows]
+
+
+def followed_posts(user, values=None):
+    """Лента подписок и параметры для ``CursorPaginator``.
+
+    Без «популярных» авторов лента читается из ``FeedEntry``; иначе
+    их посты объединяются с материализованной частью при чтении.
+    С ``values`` вместо моделей выбираются словари с этими колонками
+    поста (как в ``QuerySet.values``).
+    """
+    celebrities = followed_celebrities(user)
+    if not celebrities:
+        entries = FeedEntry.objects.filter(user=user)
+        if values is not None:
+            rows = entries.values('pub_date', 'post_id', *(
+                f'post__{column}' for column in values))
+            return rows, {
+                'ordering': FEED_ORDERING,
+                'transform': partial(_post_columns, values),
+            }
+        entries = (
+            entries.select_related('post__author', 'post__group')
+            .only('pub_date', 'post_id', *(
+                f'post__{field}' for field in FEED_FIELDS))
+        )
+        return entries, {
+            'ordering': FEED_ORDERING,
+            'transform': lambda rows: [entry.post for entry in rows],
+        }
+    posts = Post.objects.filter(
+        Q(pk__in=FeedEntry.objects.filter(user=user).values('post_id'))
+        | Q(author_id__in=celebrities)
+    )
+    if values is not None:
+        return posts.values(*values), {}
+    return posts.for_feed(), {}
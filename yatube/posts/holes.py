@@ -0,0 +1,12 @@
+"""Персональные данные фрагментов страниц ``posts`` (см. ``core.holes``)."""
+from core import holes
+
+from .models import Follow
+
+
+@holes.provider('posts/includes/follow_button.html')
+def follow_button(request, username):
+    """Подписан ли текущий пользователь на автора профиля."""
+    following = request.user.is_authenticated and Follow.objects.filter(
+        user=request.user, author__username=username).exists()
+    return {'following': following}
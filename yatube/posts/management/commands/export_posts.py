@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import exporter
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает посты автора или группы в JSONL или CSV, который '
+        'читает import_yatube. Посты читаются порциями, память не растёт.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--author', help='username автора.')
+        parser.add_argument('--group', help='slug группы.')
+        parser.add_argument(
+            '--format', choices=tuple(exporter.FORMATS), default='jsonl')
+        parser.add_argument(
+            '--gzip', action='store_true', help='Сжимать на лету.')
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000,
+            help='Сколько постов читать из базы за раз.',
+        )
+        parser.add_argument(
+            '-o', '--output', help='Файл; по умолчанию stdout команды.')
+
+    def handle(self, *args, **options):
+        queryset = exporter.posts_queryset(
+            author=options['author'], group=options['group'])
+        chunks = exporter.export(
+            queryset, options['format'], options['gzip'],
+            options['chunk_size'],
+        )
+        if options['output']:
+            with open(options['output'], 'wb') as file:
+                for chunk in chunks:
+                    file.write(chunk)
+            return
+        # У консоли пишем байты в буфер; поток из call_command(stdout=...)
+        # текстовый, и в него уходит только несжатая выгрузка.
+        stream = getattr(self.stdout, 'buffer', None)
+        if stream is None:
+            if options['gzip']:
+                raise CommandError('Для --gzip укажите файл: -o')
+            for chunk in chunks:
+                self.stdout.write(chunk.decode(), ending='')
+            return
+        self.stdout.flush()
+        for chunk in chunks:
+            stream.write(chunk)
+        stream.flush()
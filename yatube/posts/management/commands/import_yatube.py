@@ -0,0 +1,76 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.importer import TYPES, Importer, InvalidRecord, read_records
+
+
+class Command(BaseCommand):
+    help = (
+        'Импортирует пользователей, группы, посты, комментарии и подписки '
+        'из JSONL или CSV (можно .gz). Файл читается потоком, записи '
+        'пишутся пачками, каждая пачка — одна транзакция.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл .jsonl, .csv или .gz.')
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Сколько записей писать за одну транзакцию.',
+        )
+        parser.add_argument(
+            '--type', choices=TYPES, default='post',
+            help='Тип записей без колонки type (например, в CSV).',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл контрольной точки: с неё импорт продолжится '
+                 'после сбоя.',
+        )
+
+    def handle(self, *args, **options):
+        path = os.path.abspath(options['path'])
+        checkpoint = options['checkpoint']
+        done = self.read_checkpoint(checkpoint, path)
+        if done:
+            self.stdout.write(f'Продолжаем после записи {done}')
+        importer = Importer(options['batch_size'])
+        # Последняя запись, которая уже в базе: о ней и сообщаем при сбое.
+        flushed = done
+        try:
+            for number, record in read_records(path, options['type']):
+                if number <= done:
+                    continue
+                if importer.add(record):
+                    importer.flush()
+                    self.write_checkpoint(checkpoint, path, number)
+                    flushed = number
+            importer.flush()
+        except (InvalidRecord, OSError) as error:
+            raise CommandError(f'После записи {flushed}: {error}')
+        if checkpoint and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        for kind in TYPES:
+            self.stdout.write(f'{kind}: {importer.written[kind]}')
+        if importer.skipped:
+            self.stdout.write(f'Пропущено записей: {importer.skipped}')
+
+    def read_checkpoint(self, checkpoint, path):
+        if not checkpoint or not os.path.exists(checkpoint):
+            return 0
+        with open(checkpoint) as file:
+            state = json.load(file)
+        if state.get('path') != path:
+            raise CommandError(
+                f'Контрольная точка {checkpoint} относится к другому файлу')
+        return state['done']
+
+    def write_checkpoint(self, checkpoint, path, done):
+        if not checkpoint:
+            return
+        # Сначала временный файл: точка не должна повредиться при сбое.
+        temporary = f'{checkpoint}.tmp'
+        with open(temporary, 'w') as file:
+            json.dump({'path': path, 'done': done}, file)
+        os.replace(temporary, checkpoint)
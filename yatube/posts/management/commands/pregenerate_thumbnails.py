@@ -0,0 +1,41 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт миниатюры для уже загруженных картинок постов. '
+        'Готовые миниатюры пропускаются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Сколько картинок обрабатывать параллельно.',
+        )
+
+    def handle(self, *args, **options):
+        names = (
+            Post.objects.exclude(image='')
+            .values_list('image', flat=True).distinct().iterator()
+        )
+        if options['workers'] > 1:
+            with ThreadPoolExecutor(options['workers']) as pool:
+                results = list(pool.map(self.generate, names))
+        else:
+            results = [thumbnails.generate(name) for name in names]
+        self.stdout.write(
+            f'Обработано картинок: {results.count(True)}, '
+            f'ошибок: {results.count(False)}'
+        )
+
+    def generate(self, name):
+        try:
+            return thumbnails.generate(name)
+        finally:
+            close_old_connections()
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from posts.search import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        'Перестраивает поисковый индекс постов. '
+        'Таблица обходится порциями, каждая порция — короткая транзакция.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Сколько постов индексировать за одну транзакцию.',
+        )
+
+    def handle(self, *args, **options):
+        indexed = rebuild(options['chunk_size'])
+        self.stdout.write(f'Проиндексировано постов: {indexed}')
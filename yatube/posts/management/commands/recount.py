@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import recount_all
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает счётчики постов, комментариев и подписок. '
+        'Таблицы обходятся порциями, каждая порция — короткая транзакция.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Сколько строк пересчитывать за одну транзакцию.',
+        )
+
+    def handle(self, *args, **options):
+        fixed = recount_all(options['chunk_size'])
+        for name, count in fixed.items():
+            self.stdout.write(f'{name}: исправлено {count}')
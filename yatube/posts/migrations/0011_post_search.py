@@ -0,0 +1,35 @@
+from django.db import migrations
+
+CREATE = (
+    "CREATE VIRTUAL TABLE posts_post_fts USING fts5("
+    "text, group_title, tokenize = 'unicode61 remove_diacritics 2')"
+)
+FILL = (
+    "INSERT INTO posts_post_fts (rowid, text, group_title) "
+    "SELECT p.id, p.text, COALESCE(g.title, '') FROM posts_post p "
+    "LEFT JOIN posts_group g ON g.id = p.group_id"
+)
+
+
+def create_index(apps, schema_editor):
+    """Индекс FTS5 есть только в SQLite; на других СУБД — icontains."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(CREATE)
+    schema_editor.execute(FILL)
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS posts_post_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,302 @@
+"""Курсорная (keyset) пагинация лент.
+
+Вместо ``OFFSET n LIMIT 10`` и ``COUNT(*)`` страница выбирается по
+ключу сортировки последней/первой записи соседней страницы:
+``WHERE (pub_date, id) < (:pub_date, :id) ORDER BY pub_date DESC, id DESC``.
+Токен курсора непрозрачен для клиента и передаётся в ``?cursor=``.
+
+Соседние страницы открываются от курсора текущей с ``?skip=k``: это
+``OFFSET`` не больше ``MAX_SKIP`` страниц, а не от начала ленты. Старые
+ссылки ``?page=N`` читаются от начала, поэтому и они ограничены
+``MAX_SKIP + 1``.
+Последняя страница — отдельный курсор, который читает ленту с конца.
+Поэтому окно номеров страниц (``page_window``) стоит O(1) при любой
+длине ленты; общее число записей берётся из счётчиков, а не ``COUNT(*)``.
+"""
+import base64
+import binascii
+import json
+
+from django.core.exceptions import FieldDoesNotExist
+from django.core.paginator import (EmptyPage, InvalidPage, Page,
+                                   PageNotAnInteger, Paginator)
+from django.db.models import Q
+
+FORWARD = 'n'
+BACKWARD = 'p'
+LAST = 'l'
+MAX_SKIP = 10
+
+
+class InvalidCursor(InvalidPage):
+    pass
+
+
+class CursorPage(Page):
+    """Страница курсорной пагинации.
+
+    Сохраняет контракт ``Page`` для шаблонов (итерация, ``has_next``,
+    ``has_previous``), но не обращается к ``paginator.count``.
+    """
+
+    def __init__(self, object_list, number, paginator,
+                 next_cursor=None, previous_cursor=None):
+        super().__init__(object_list, number, paginator)
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<CursorPage %s>' % self.number
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def next_page_number(self):
+        return self.number + 1
+
+    def previous_page_number(self):
+        return self.number - 1
+
+    def start_index(self):
+        if not self.object_list:
+            return 0
+        return self.paginator.per_page * (self.number - 1) + 1
+
+    def end_index(self):
+        return self.start_index() + len(self.object_list) - 1
+
+    def page_window(self, radius=2):
+        """Первая, последняя и ``radius`` соседних страниц с каждой стороны.
+
+        Элементы — пары (номер, параметры запроса): для текущей страницы
+        параметры ``None``, для первой — пустая строка, пропуск в
+        нумерации — ``(None, None)``. Последняя страница и страницы
+        впереди выводятся, только если известно общее число записей.
+        """
+        number = self.number
+        last = self.paginator.num_pages if self.paginator.has_count else None
+        window = []
+        start = max(1, number - radius)
+        if start > 1:
+            window.append((1, ''))
+            if start > 2:
+                window.append((None, None))
+        for target in range(start, number):
+            window.append((target, self._link(
+                self.previous_cursor, number - 1 - target, target)))
+        window.append((number, None))
+        if self.has_next():
+            # Без общего числа записей известно лишь, что есть следующая.
+            end = number + 1 if last is None else min(number + radius, last)
+            for target in range(number + 1, max(end, number + 1) + 1):
+                window.append((target, self._link(
+                    self.next_cursor, target - number - 1, target)))
+            if last is not None and end < last:
+                if end < last - 1:
+                    window.append((None, None))
+                window.append(
+                    (last, 'cursor=' + self.paginator.last_cursor()))
+        return window
+
+    @staticmethod
+    def _link(cursor, skip, target):
+        if target == 1:
+            return ''
+        if skip:
+            return f'cursor={cursor}&skip={skip}'
+        return f'cursor={cursor}'
+
+
+class CursorPaginator(Paginator):
+    """Пагинатор по ключу ``ordering`` (по умолчанию ``(pub_date, id)``).
+
+    ``transform`` позволяет отдавать в шаблон не сами строки выборки,
+    а связанные с ними объекты (например, посты записей ленты).
+    ``count`` — общее число записей из точных счётчиков (не оценка: по
+    нему считается размер последней страницы); без него пагинатор не
+    знает последней страницы, но и не считает строки.
+    """
+
+    def __init__(self, object_list, per_page,
+                 ordering=('-pub_date', '-id'), transform=None, count=None):
+        super().__init__(object_list.order_by(*ordering), per_page)
+        self.ordering = ordering
+        self.keys = [field.lstrip('-') for field in ordering]
+        self.descending = ordering[0].startswith('-')
+        self.transform = transform
+        self.has_count = count is not None
+        if self.has_count:
+            # Подменяет cached_property Paginator.count.
+            self.count = count
+
+    def get_page(self, cursor=None, number=None, skip=None):
+        """Как ``Paginator.get_page``: при ошибке отдаёт первую страницу."""
+        try:
+            page = self.page(cursor, number, skip)
+        except InvalidPage:
+            return self.page()
+        if cursor and not page.object_list:
+            return self.page()
+        return page
+
+    def last_cursor(self):
+        return self._token([LAST, self.num_pages])
+
+    def page(self, cursor=None, number=None, skip=None):
+        queryset = self.object_list
+        offset = 0
+        if cursor:
+            direction, number, values = self.decode(cursor)
+            if direction == LAST:
+                return self._last_page(number)
+            skip = self._validate_skip(skip)
+            queryset = queryset.filter(self._seek(values, direction))
+            offset = skip * self.per_page
+            number += skip if direction == FORWARD else -skip
+        else:
+            direction = FORWARD
+            number = self._validate_number(number)
+            offset = (number - 1) * self.per_page
+        if direction == BACKWARD:
+            queryset = queryset.order_by(*self._reversed_ordering())
+        rows = list(queryset[offset:offset + self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        next_cursor = previous_cursor = None
+        if direction == FORWARD:
+            if has_more:
+                next_cursor = self.encode(FORWARD, number + 1, rows[-1])
+            if rows and (cursor or offset):
+                previous_cursor = self.encode(
+                    BACKWARD, number - 1, rows[0])
+        else:
+            rows.reverse()
+            if has_more:
+                previous_cursor = self.encode(
+                    BACKWARD, number - 1, rows[0])
+            else:
+                # Дошли до начала ленты: это первая страница.
+                number = 1
+            if rows:
+                next_cursor = self.encode(FORWARD, number + 1, rows[-1])
+
+        object_list = self.transform(rows) if self.transform else rows
+        return CursorPage(
+            object_list, number, self,
+            next_cursor=next_cursor, previous_cursor=previous_cursor,
+        )
+
+    def _last_page(self, number):
+        """Хвост ленты: столько записей, сколько осталось по счётчику."""
+        size = self.per_page
+        if self.has_count and self.count % self.per_page:
+            size = self.count % self.per_page
+        rows = list(
+            self.object_list.order_by(*self._reversed_ordering())[:size])
+        rows.reverse()
+        previous_cursor = None
+        if rows and number > 1:
+            previous_cursor = self.encode(BACKWARD, number - 1, rows[0])
+        object_list = self.transform(rows) if self.transform else rows
+        return CursorPage(
+            object_list, number, self, previous_cursor=previous_cursor)
+
+    def encode(self, direction, number, row):
+        values = [_dump(_key_value(row, key)) for key in self.keys]
+        return self._token([direction, max(number, 1)] + values)
+
+    @staticmethod
+    def _token(payload):
+        token = base64.urlsafe_b64encode(json.dumps(payload).encode())
+        return token.decode().rstrip('=')
+
+    def decode(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            direction, number, *values = payload
+        except (binascii.Error, ValueError, TypeError):
+            raise InvalidCursor('Некорректный курсор')
+        if direction == LAST and isinstance(number, int) and not values:
+            return direction, max(number, 1), values
+        if (direction not in (FORWARD, BACKWARD)
+                or not isinstance(number, int)
+                or len(values) != len(self.keys)):
+            raise InvalidCursor('Некорректный курсор')
+        try:
+            values = [
+                self._to_python(key, value)
+                for key, value in zip(self.keys, values)
+            ]
+        except Exception:
+            raise InvalidCursor('Некорректный курсор')
+        return direction, max(number, 1), values
+
+    def _to_python(self, key, value):
+        try:
+            field = self.object_list.model._meta.get_field(key)
+        except FieldDoesNotExist:
+            # Ключ-аннотация (например, ранг поиска): только числа.
+            if not isinstance(value, (int, float)):
+                raise InvalidCursor('Некорректный курсор')
+            return value
+        return field.to_python(value)
+
+    def _validate_number(self, number):
+        if number is None:
+            return 1
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('Номер страницы не является числом')
+        if number < 1:
+            raise EmptyPage('Номер страницы меньше 1')
+        if number > MAX_SKIP + 1:
+            # Старые ссылки ?page=N читаются через OFFSET от начала ленты.
+            raise EmptyPage('Номер страницы слишком велик')
+        return number
+
+    def _validate_skip(self, skip):
+        if skip in (None, ''):
+            return 0
+        try:
+            skip = int(skip)
+        except (TypeError, ValueError):
+            raise InvalidCursor('Некорректный сдвиг')
+        if not 0 <= skip <= MAX_SKIP:
+            raise InvalidCursor('Некорректный сдвиг')
+        return skip
+
+    def _reversed_ordering(self):
+        return [
+            field[1:] if field.startswith('-') else '-' + field
+            for field in self.ordering
+        ]
+
+    def _seek(self, values, direction):
+        """Условие «строго после якоря» в направлении обхода."""
+        lookup = 'lt' if (direction == FORWARD) == self.descending else 'gt'
+        condition = Q()
+        for index, key in enumerate(self.keys):
+            step = Q(**{f'{key}__{lookup}': values[index]})
+            for prev_key, prev_value in zip(self.keys, values[:index]):
+                step &= Q(**{prev_key: prev_value})
+            condition |= step
+        return condition
+
+
+def _key_value(row, key):
+    if isinstance(row, dict):
+        return row[key]
+    return getattr(row, key)
+
+
+def _dump(value):
+    # DjangoJSONEncoder обрезает микросекунды, а ключ должен совпадать точно.
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
@@ -0,0 +1,163 @@
+"""Полнотекстовый поиск по постам на SQLite FTS5.
+
+Текст поста и название его группы лежат в виртуальной таблице
+``posts_post_fts``, где ``rowid`` совпадает с id поста. Таблица
+обновляется сигналами, а ``rebuild_search_index`` перестраивает её
+целиком. На других СУБД поиск откатывается к ``icontains``.
+"""
+import re
+
+from django.db import connection, transaction
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+
+from .counters import chunked_ids
+from .models import Post
+
+TABLE = 'posts_post_fts'
+
+# Совпадение в тексте важнее совпадения в названии группы.
+RANK = f'bm25({TABLE}, 1.0, 0.5)'
+RANK_ORDERING = ('rank', 'id')
+
+# RawSQL в ``pk__in`` получает двойные скобки, и SQLite берёт из
+# подзапроса только первую строку, поэтому условие добавляется в WHERE.
+_MATCH_IDS = (
+    f'posts_post.id IN (SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s)'
+)
+# Для ранжирования таблица индекса присоединяется к постам: SQLite
+# обходит совпадения по индексу один раз, а ``bm25`` считается для
+# текущей строки. Коррелированный подзапрос с ``MATCH`` повторял бы
+# поиск для каждого совпадения — и ещё раз в условии курсора.
+_JOIN = [f'{TABLE}.rowid = posts_post.id', f'{TABLE} MATCH %s']
+_INSERT = (
+    f'INSERT INTO {TABLE} (rowid, text, group_title) '
+    'SELECT p.id, p.text, COALESCE(g.title, \'\') FROM posts_post p '
+    'LEFT JOIN posts_group g ON g.id = p.group_id '
+)
+
+
+def available():
+    return connection.vendor == 'sqlite'
+
+
+def match_expression(query):
+    """Запрос пользователя как выражение FTS5: все слова, по префиксу.
+
+    Каждое слово берётся в кавычки, поэтому синтаксис FTS5 (``OR``,
+    ``NEAR``, ``*``, скобки) из пользовательского ввода не работает.
+    """
+    words = re.findall(r'\w+', query)
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def search(query, queryset=None):
+    """Посты, подходящие под запрос, и порядок для пагинатора.
+
+    Результаты упорядочены по релевантности (``rank``, меньше — лучше),
+    при равенстве — по id; оба ключа годятся для курсора.
+    """
+    if queryset is None:
+        queryset = Post.objects.for_feed()
+    if not available():
+        return (
+            queryset.filter(
+                Q(text__icontains=query) | Q(group__title__icontains=query)
+            ),
+            ('-pub_date', '-id'),
+        )
+    expression = match_expression(query)
+    if not expression:
+        return queryset.none(), RANK_ORDERING
+    return (
+        queryset.extra(tables=[TABLE], where=_JOIN, params=[expression])
+        .annotate(rank=RawSQL(RANK, (), output_field=FloatField())),
+        RANK_ORDERING,
+    )
+
+
+def filter_posts(queryset, query):
+    """Сузить выборку постов запросом без ранжирования (для админки)."""
+    if not available():
+        return queryset.filter(text__icontains=query)
+    expression = match_expression(query)
+    if not expression:
+        return queryset.none()
+    return _match(queryset, expression)
+
+
+def _match(queryset, expression):
+    return queryset.extra(where=[_MATCH_IDS], params=[expression])
+
+
+def index_post(post):
+    if not available():
+        return
+    group_title = post.group.title if post.group_id else ''
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [post.pk])
+        cursor.execute(
+            f'INSERT INTO {TABLE} (rowid, text, group_title) '
+            'VALUES (%s, %s, %s)',
+            [post.pk, post.text, group_title],
+        )
+
+
+def index_posts(post_ids):
+    """Проиндексировать пачку постов одним ``INSERT ... SELECT``."""
+    if not available():
+        return
+    post_ids = list(post_ids)
+    # Не больше 500 параметров: старые SQLite разрешают лишь 999.
+    for start in range(0, len(post_ids), 500):
+        chunk = post_ids[start:start + 500]
+        placeholders = ', '.join(['%s'] * len(chunk))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {TABLE} WHERE rowid IN ({placeholders})', chunk)
+            cursor.execute(
+                _INSERT + f'WHERE p.id IN ({placeholders})', chunk)
+
+
+def unindex_post(post_id):
+    if not available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [post_id])
+
+
+def reindex_group(group_id, title):
+    """Обновить название группы у всех её постов в индексе."""
+    if not available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'UPDATE {TABLE} SET group_title = %s WHERE rowid IN '
+            '(SELECT id FROM posts_post WHERE group_id = %s)',
+            [title, group_id],
+        )
+
+
+def rebuild(chunk_size=1000):
+    """Перестроить индекс порциями; поиск всё это время работает.
+
+    Каждая порция id заменяется в отдельной транзакции, затем
+    удаляются строки уже несуществующих постов.
+    """
+    indexed = 0
+    for ids in chunked_ids(Post, chunk_size):
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {TABLE} WHERE rowid BETWEEN %s AND %s',
+                [ids[0], ids[-1]],
+            )
+            cursor.execute(
+                _INSERT + 'WHERE p.id BETWEEN %s AND %s', [ids[0], ids[-1]])
+        indexed += len(ids)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {TABLE} WHERE rowid NOT IN '
+            '(SELECT id FROM posts_post)'
+        )
+        cursor.execute(f"INSERT INTO {TABLE} ({TABLE}) VALUES ('optimize')")
+    return indexed
@@ -0,0 +1,201 @@
+from django.db import transaction
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from . import cache, counters, feed, search
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+
+@receiver(post_save, sender=User)
+def create_user_stats(sender, instance, created, raw=False, **kwargs):
+    """Заводим счётчики новому пользователю."""
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(pre_save, sender=Post)
+def remember_group(sender, instance, raw=False, **kwargs):
+    """Запоминаем прежнюю группу редактируемого поста."""
+    if instance.pk and not raw:
+        instance._previous_group_id = (
+            Post.objects.filter(pk=instance.pk)
+            .values_list('group_id', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Post)
+def count_post(sender, instance, created, raw=False, **kwargs):
+    """Обновляем счётчики постов автора и групп."""
+    if raw:
+        return
+    if created:
+        counters.change_user(instance.author_id, 'posts_count', 1)
+        counters.change_group(instance.group_id, 1)
+        counters.change_total_posts(1)
+        return
+    previous_group_id = getattr(instance, '_previous_group_id', None)
+    if previous_group_id != instance.group_id:
+        counters.change_group(previous_group_id, -1)
+        counters.change_group(instance.group_id, 1)
+
+
+@receiver(post_delete, sender=Post)
+def uncount_post(sender, instance, **kwargs):
+    counters.change_user(instance.author_id, 'posts_count', -1)
+    counters.change_group(instance.group_id, -1)
+    counters.change_total_posts(-1)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.change_post(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_comment(sender, instance, **kwargs):
+    counters.change_post(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def count_follow(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.change_user(instance.user_id, 'following_count', 1)
+        counters.change_user(instance.author_id, 'followers_count', 1)
+
+
+@receiver(post_delete, sender=Follow)
+def uncount_follow(sender, instance, **kwargs):
+    counters.change_user(instance.user_id, 'following_count', -1)
+    counters.change_user(instance.author_id, 'followers_count', -1)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, raw=False, **kwargs):
+    """Раскладываем новый пост по лентам подписчиков."""
+    if created and not raw:
+        feed.fan_out(instance)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_feed(sender, instance, created, raw=False, **kwargs):
+    """Заполняем ленту постами автора после подписки."""
+    if created and not raw:
+        feed.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def purge_feed(sender, instance, **kwargs):
+    """Чистим ленту после отписки."""
+    feed.purge(instance.user_id, instance.author_id)
+
+
+def _invalidate(scopes):
+    # Внутри транзакции страницу могут перестроить по ещё не
+    # зафиксированным данным и сохранить под новой версией, поэтому
+    # после фиксации версии меняем ещё раз.
+    cache.bump(*scopes)
+    transaction.on_commit(lambda: cache.bump(*scopes))
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_pages(sender, instance, raw=False, **kwargs):
+    """Сбрасываем кеш страниц, на которых показывается пост."""
+    if raw:
+        return
+    scopes = cache.post_scopes(instance)
+    previous_group_id = getattr(instance, '_previous_group_id', None)
+    if previous_group_id not in (None, instance.group_id):
+        slug = (
+            Group.objects.filter(pk=previous_group_id)
+            .values_list('slug', flat=True).first()
+        )
+        scopes.append(f'group:{slug}')
+    _invalidate(scopes)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_pages(sender, instance, raw=False, **kwargs):
+    """Кнопка подписки и счётчики есть на профилях обоих пользователей."""
+    if raw:
+        return
+    usernames = User.objects.filter(
+        pk__in=[instance.user_id, instance.author_id]
+    ).values_list('username', flat=True)
+    _invalidate([f'author:{username}' for username in usernames])
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_pages(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _invalidate([f'post:{instance.post_id}'])
+
+
+@receiver(post_save, sender=Group)
+def invalidate_group_pages(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _invalidate(['index', f'group:{instance.slug}'])
+
+
+AUTHOR_NAME_FIELDS = ('username', 'first_name', 'last_name')
+
+
+@receiver(pre_save, sender=User)
+def remember_author_name(sender, instance, raw=False, update_fields=None,
+                         **kwargs):
+    """Запоминаем прежнее имя пользователя, которое выводят карточки."""
+    if instance.pk and not raw and update_fields != frozenset({'last_login'}):
+        instance._previous_name = (
+            User.objects.filter(pk=instance.pk)
+            .values_list(*AUTHOR_NAME_FIELDS).first()
+        )
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_pages(sender, instance, created, raw=False,
+                            update_fields=None, **kwargs):
+    """Имя автора есть на его профиле; вход в систему его не меняет.
+
+    Карточки с именем есть и на главной, и в группах его постов: их
+    сбрасываем, только если имя действительно изменилось.
+    """
+    if raw or update_fields == frozenset({'last_login'}):
+        return
+    scopes = [f'author:{instance.username}']
+    previous = getattr(instance, '_previous_name', None)
+    name = tuple(getattr(instance, field) for field in AUTHOR_NAME_FIELDS)
+    if previous is not None and previous != name:
+        slugs = (
+            Group.objects.filter(posts__author=instance)
+            .values_list('slug', flat=True).distinct()
+        )
+        scopes += ['index', *(f'group:{slug}' for slug in slugs)]
+    _invalidate(scopes)
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, raw=False, **kwargs):
+    """Держим поисковый индекс в актуальном состоянии."""
+    if not raw:
+        search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search.unindex_post(instance.pk)
+
+
+@receiver(post_save, sender=Group)
+def reindex_group(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        search.reindex_group(instance.pk, instance.title)
+
+
+@receiver(pre_delete, sender=Group)
+def unindex_group(sender, instance, **kwargs):
+    """После удаления группы её посты остаются без группы."""
+    search.reindex_group(instance.pk, '')
@@ -0,0 +1,16 @@
+from django import template
+
+from .. import thumbnails
+from ..cache import render_cards
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_cards(posts, template_name):
+    """Карточки постов страницы из общего кеша карточек.
+
+    ``{% post_cards page_obj 'posts/includes/post_list.html' as cards %}``
+    Миниатюры для нерендеренных карточек ищутся одним запросом.
+    """
+    return render_cards(posts, template_name, prepare=thumbnails.resolve)
@@ -0,0 +1,20 @@
+from django import template
+
+from .. import thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_thumbnail(post):
+    """Миниатюра картинки поста или ``None``, пока её нет.
+
+    На страницах с карточками миниатюры уже найдены разом через
+    ``thumbnails.resolve``; здесь ищем только для одиночного поста.
+    Миниатюра в запросе не создаётся, а ставится в очередь.
+    """
+    if not post.image:
+        return None
+    if not hasattr(post, 'thumbnail'):
+        thumbnails.resolve([post])
+    return post.thumbnail
@@ -0,0 +1,167 @@
+import hashlib
+import threading
+import time
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import (Client, RequestFactory, SimpleTestCase, TestCase,
+                         override_settings)
+from django.urls import reverse
+
+from core import locks
+
+from ..cache import ANON_LOCK_KEY, ANON_PAGE_KEY, anonymous_page
+from ..models import Group, Post, User
+
+
+class AnonymousPageCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='Author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='')
+        cls.post = Post.objects.create(
+            text='Первый пост', author=cls.author, group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'group'}),
+            reverse('posts:profile', kwargs={'username': 'Author'}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        ]
+
+    def lock(self, url):
+        digest = hashlib.md5(url.encode()).hexdigest()
+        return ANON_LOCK_KEY.format(digest)
+
+    def test_anonymous_pages_are_cached(self):
+        '''Повторный показ анонимам не строит страницу заново.'''
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.client.get(url)
+                # Остаётся лишь поиск автора и группы поста для его областей.
+                queries = 1 if 'posts/' in url else 0
+                with self.assertNumQueries(queries):
+                    self.assertContains(self.client.get(url), 'Первый пост')
+
+    def test_stale_page_is_served_while_another_request_rebuilds(self):
+        '''Пока страницу перестраивает другой запрос, отдаётся старая копия.'''
+        url = reverse('posts:index')
+        self.client.get(url)
+        Post.objects.create(text='Второй пост', author=self.author)
+        locks.acquire(self.lock(url), 30)
+        with self.assertNumQueries(0):
+            self.assertNotContains(self.client.get(url), 'Второй пост')
+        locks.release(self.lock(url))
+        self.assertContains(self.client.get(url), 'Второй пост')
+
+    def test_stale_page_keeps_its_own_validators(self):
+        '''Устаревшая копия не получает ETag новых версий и 304 на него.'''
+        url = reverse('posts:group_list', kwargs={'slug': 'group'})
+        fresh_etag = self.client.get(url)['ETag']
+        Post.objects.create(
+            text='Второй пост', author=self.author, group=self.group)
+        locks.acquire(self.lock(url), 30)
+        self.addCleanup(locks.release, self.lock(url))
+        stale = self.client.get(url)
+        self.assertNotContains(stale, 'Второй пост')
+        self.assertEqual(stale['ETag'], fresh_etag)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=stale['ETag'])
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(ANON_PAGE_WAIT=0)
+    def test_missing_page_is_rendered_when_lock_is_busy(self):
+        url = reverse('posts:index')
+        locks.acquire(self.lock(url), 30)
+        self.addCleanup(locks.release, self.lock(url))
+        self.assertContains(self.client.get(url), 'Первый пост')
+
+    @override_settings(ANON_PAGE_TTL=60, ANON_PAGE_JITTER=0.5)
+    def test_fresh_copy_expires_after_jittered_ttl(self):
+        '''Свежесть копии — TTL со случайным разбросом, затем перестройка.'''
+        url = reverse('posts:index')
+        with mock.patch('posts.cache.random.uniform', return_value=1.5), \
+                mock.patch('posts.cache.time.time', return_value=1000):
+            self.client.get(url)
+        with mock.patch('posts.cache.time.time', return_value=1089):
+            self.assertIsNone(self.client.get(url).context)
+        with mock.patch('posts.cache.time.time', return_value=1091):
+            self.assertIsNotNone(self.client.get(url).context)
+
+    def test_users_get_fresh_post_page(self):
+        '''На странице поста у пользователя есть форма с CSRF: не кешируем.'''
+        self.client.force_login(self.author)
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        self.client.get(url)
+        self.assertIsNotNone(self.client.get(url).context)
+
+
+class SingleFlightTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def request(self, path):
+        request = RequestFactory().get(path)
+        request.user = AnonymousUser()
+        return request
+
+    def test_concurrent_misses_render_once(self):
+        '''Одновременные промахи строят страницу один раз.'''
+        calls = []
+        results = []
+        start = threading.Barrier(8)
+
+        def render():
+            calls.append(1)
+            time.sleep(0.1)
+            return HttpResponse('страница')
+
+        def get():
+            request = self.request('/single-flight/')
+            start.wait()
+            results.append(anonymous_page(request, [1], render, 'view'))
+
+        threads = [threading.Thread(target=get) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(
+            [response.content for response in results],
+            ['страница'.encode()] * 8)
+
+    def test_page_built_before_lock_is_not_rebuilt(self):
+        '''Копию, построенную до взятия блокировки, не строим заново.'''
+        request = self.request('/built/')
+        key = ANON_PAGE_KEY.format(hashlib.md5(b'/built/').hexdigest())
+        built = HttpResponse('чужая копия')
+        acquire = locks.acquire
+
+        def acquire_after_other_worker(name, timeout):
+            cache.set(key, ([1], time.time() + 60, built))
+            return acquire(name, timeout)
+
+        with mock.patch(
+                'posts.cache.locks.acquire', acquire_after_other_worker):
+            response = anonymous_page(
+                request, [1], mock.Mock(side_effect=AssertionError), 'view')
+        self.assertEqual(response.content, 'чужая копия'.encode())
+
+    @override_settings(ANON_PAGE_WAIT=5)
+    def test_waiters_stop_when_lock_is_released_without_page(self):
+        '''Если копию не сохранили, ожидающие строят страницу сразу.'''
+        lock = ANON_LOCK_KEY.format(hashlib.md5(b'/released/').hexdigest())
+        locks.acquire(lock, 30)
+        threading.Timer(0.05, locks.release, (lock,)).start()
+        started = time.monotonic()
+        response = anonymous_page(
+            self.request('/released/'), [1],
+            lambda: HttpResponse('страница'), 'view')
+        self.assertEqual(response.content, 'страница'.encode())
+        self.assertLess(time.monotonic() - started, 1)
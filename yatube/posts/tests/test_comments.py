@@ -0,0 +1,71 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Post, User
+from ..views import COMMENTS_PER_PAGE
+
+
+class CommentPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='Author')
+        cls.post = Post.objects.create(text='Пост', author=cls.author)
+        cls.total = COMMENTS_PER_PAGE * 2 + 5
+        for i in range(cls.total):
+            commenter = User.objects.create_user(username=f'Commenter{i}')
+            Comment.objects.create(
+                post=cls.post, author=commenter, text=f'Комментарий {i}')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_post_page_renders_first_page(self):
+        '''На странице поста — первая страница комментариев и ссылка дальше.'''
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.post.pk]))
+        comments = response.context['comments']
+        self.assertEqual(len(comments), COMMENTS_PER_PAGE)
+        self.assertEqual(comments[0].text, 'Комментарий 0')
+        self.assertContains(
+            response,
+            reverse('posts:post_comments', args=[self.post.pk])
+            + f'?cursor={comments.next_cursor}',
+        )
+
+    def test_fragments_load_remaining_comments(self):
+        '''Фрагменты отдают оставшиеся комментарии по одному запросу.'''
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        page = self.client.get(url).context['comments']
+        texts = [comment.text for comment in page]
+        fragment_url = reverse('posts:post_comments', args=[self.post.pk])
+        while page.has_next():
+            with self.assertNumQueries(1):
+                response = self.client.get(
+                    fragment_url, {'cursor': page.next_cursor})
+            page = response.context['comments']
+            texts += [comment.text for comment in page]
+        self.assertEqual(
+            texts, [f'Комментарий {i}' for i in range(self.total)])
+        self.assertNotContains(response, 'Ещё комментарии')
+
+    def test_fragment_of_missing_post_is_404(self):
+        url = reverse('posts:post_comments', args=[self.post.pk + 100])
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_bad_cursor_does_not_repeat_first_page(self):
+        '''Испорченный курсор — 404, исчерпанный — пустой фрагмент.'''
+        url = reverse('posts:post_comments', args=[self.post.pk])
+        self.assertEqual(
+            self.client.get(url, {'cursor': 'broken'}).status_code, 404)
+        cursor = self.client.get(url).context['comments'].next_cursor
+        cursor = self.client.get(
+            url, {'cursor': cursor}).context['comments'].next_cursor
+        Comment.objects.filter(text__in=[
+            f'Комментарий {i}' for i in range(
+                COMMENTS_PER_PAGE * 2, self.total)
+        ]).delete()
+        response = self.client.get(url, {'cursor': cursor})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.context['comments'])
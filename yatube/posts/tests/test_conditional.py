@@ -0,0 +1,80 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.testing import run_on_commit
+
+from ..models import Comment, Group, Post, User
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='')
+        cls.post = Post.objects.create(
+            text='Пост', author=cls.author, group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def revalidate(self, url, response, header='ETag'):
+        request_header = {
+            'ETag': 'HTTP_IF_NONE_MATCH',
+            'Last-Modified': 'HTTP_IF_MODIFIED_SINCE',
+        }[header]
+        return self.client.get(url, **{request_header: response[header]})
+
+    def test_unchanged_pages_return_304(self):
+        '''Неизменная страница отдаёт 304 без запросов к базе.'''
+        urls = [
+            reverse('posts:group_list', kwargs={'slug': 'group'}),
+            reverse('posts:profile', kwargs={'username': 'Author'}),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                with self.assertNumQueries(0):
+                    not_modified = self.revalidate(url, response)
+                self.assertEqual(not_modified.status_code, 304)
+                self.assertEqual(
+                    self.revalidate(url, response, 'Last-Modified')
+                    .status_code, 304)
+
+    def test_changes_invalidate_validators(self):
+        '''Новый пост, правка и комментарий меняют ETag.'''
+        group_url = reverse('posts:group_list', kwargs={'slug': 'group'})
+        detail_url = reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.pk})
+        group_page = self.client.get(group_url)
+        detail_page = self.client.get(detail_url)
+        self.assertEqual(self.revalidate(detail_url, detail_page).status_code,
+                         304)
+
+        Comment.objects.create(post=self.post, author=self.author, text='!')
+        self.assertEqual(
+            self.revalidate(detail_url, detail_page).status_code, 200)
+
+        Post.objects.create(text='Ещё', author=self.author, group=self.group)
+        self.assertEqual(
+            self.revalidate(group_url, group_page).status_code, 200)
+
+    def test_validators_change_after_commit(self):
+        '''Страница, построенная до фиксации, сбрасывается после неё.'''
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        with run_on_commit():
+            Comment.objects.create(
+                post=self.post, author=self.author, text='!')
+            page = self.client.get(url)
+        self.assertEqual(self.revalidate(url, page).status_code, 200)
+
+    def test_etag_is_per_user(self):
+        '''ETag гостя не подходит авторизованному пользователю.'''
+        url = reverse('posts:profile', kwargs={'username': 'Author'})
+        response = self.client.get(url)
+        self.client.force_login(self.author)
+        self.assertEqual(self.revalidate(url, response).status_code, 200)
@@ -0,0 +1,94 @@
+from io import StringIO
+
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.test import TestCase
+
+from .. import counters
+from ..models import Comment, Follow, Group, Post, User, UserStats
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Reader')
+        cls.author = User.objects.create_user(username='Author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.other_group = Group.objects.create(
+            title='Другая группа', slug='other', description='Описание')
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_post_counters(self):
+        '''Посты автора и группы считаются при создании, правке и удалении.'''
+        post = Post.objects.create(
+            text='Пост', author=self.author, group=self.group)
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 1)
+
+        post.group = self.other_group
+        post.save()
+        self.group.refresh_from_db()
+        self.other_group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
+        self.assertEqual(self.other_group.posts_count, 1)
+
+        post.delete()
+        self.other_group.refresh_from_db()
+        self.assertEqual(self.stats(self.author).posts_count, 0)
+        self.assertEqual(self.other_group.posts_count, 0)
+
+    def test_comment_and_follow_counters(self):
+        '''Комментарии и подписки обновляют счётчики.'''
+        post = Post.objects.create(text='Пост', author=self.author)
+        comment = Comment.objects.create(
+            post=post, author=self.user, text='Комментарий')
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+
+        follow = Follow.objects.create(user=self.user, author=self.author)
+        self.assertEqual(self.stats(self.user).following_count, 1)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        follow.delete()
+        self.assertEqual(self.stats(self.user).following_count, 0)
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+
+    def test_total_posts_changed_by_other_worker(self):
+        '''Число постов читается мимо L1: его сдвигают и другие процессы.'''
+        cache.clear()
+        Post.objects.create(text='Пост', author=self.author)
+        # Первое чтение считает COUNT(*), второе берёт число из кеша.
+        counters.total_posts()
+        self.assertEqual(counters.total_posts(), 1)
+        caches['shared'].incr(counters.TOTAL_POSTS_KEY)
+        self.assertEqual(counters.total_posts(), 2)
+
+    def test_recount_repairs_drift(self):
+        '''Команда recount исправляет разошедшиеся счётчики.'''
+        post = Post.objects.create(
+            text='Пост', author=self.author, group=self.group)
+        Post.objects.create(text='Второй пост', author=self.author)
+        UserStats.objects.filter(user=self.author).update(posts_count=7)
+        UserStats.objects.filter(user=self.user).delete()
+        Group.objects.update(posts_count=3)
+        Post.objects.update(comments_count=5)
+        cache.set(counters.TOTAL_POSTS_KEY, 10, None)
+
+        call_command('recount', chunk_size=1, stdout=StringIO())
+
+        self.assertEqual(self.stats(self.author).posts_count, 2)
+        self.assertTrue(UserStats.objects.filter(user=self.user).exists())
+        self.group.refresh_from_db()
+        self.other_group.refresh_from_db()
+        post.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 1)
+        self.assertEqual(self.other_group.posts_count, 0)
+        self.assertEqual(post.comments_count, 0)
+        self.assertEqual(counters.total_posts(), 2)
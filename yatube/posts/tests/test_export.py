@@ -0,0 +1,86 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Group, Post, User
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Writer')
+        cls.other = User.objects.create_user(username='Other')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='')
+        for i in range(5):
+            Post.objects.create(
+                text=f'Пост {i}\nв две строки', author=cls.author,
+                group=cls.group if i % 2 else None)
+        Post.objects.create(text='Чужой пост', author=cls.other)
+        cls.staff = User.objects.create_user(username='Admin', is_staff=True)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.staff)
+
+    def download(self, **params):
+        response = self.client.get(reverse('posts:export'), params)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content)
+
+    def test_export_is_staff_only(self):
+        '''Выгрузка доступна только персоналу.'''
+        client = Client()
+        client.force_login(self.other)
+        response = client.get(reverse('posts:export'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_jsonl_in_keyset_order(self):
+        '''JSONL содержит посты автора по возрастанию id.'''
+        lines = self.download(author='Writer').decode().splitlines()
+        records = [json.loads(line) for line in lines]
+        self.assertEqual(
+            [record['id'] for record in records],
+            list(Post.objects.filter(author=self.author)
+                 .order_by('pk').values_list('pk', flat=True)),
+        )
+        self.assertEqual(records[1]['group'], 'group')
+
+    def test_gzip_csv(self):
+        '''CSV сжимается на лету и читается обратно.'''
+        data = gzip.decompress(
+            self.download(group='group', format='csv', gzip='1'))
+        text = data.decode()
+        self.assertTrue(text.startswith('id,text,pub_date,author'))
+        self.assertEqual(text.count('Writer'), 2)
+
+    def test_command_roundtrip(self):
+        '''Выгрузка команды читается import_yatube.'''
+        directory = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        path = os.path.join(directory, 'posts.csv.gz')
+        call_command(
+            'export_posts', '--format=csv', '--gzip', '--chunk-size=2',
+            '-o', path)
+        texts = list(Post.objects.order_by('pk').values_list('text', 'pk'))
+        Post.objects.all().delete()
+        call_command('import_yatube', path, stdout=StringIO())
+        self.assertEqual(
+            list(Post.objects.order_by('pk').values_list('text', 'pk')),
+            texts)
+
+    def test_command_writes_to_stdout(self):
+        '''Без -o выгрузка идёт в stdout команды.'''
+        out = StringIO()
+        call_command('export_posts', '--author=Other', stdout=out)
+        record, = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(record['text'], 'Чужой пост')
@@ -0,0 +1,131 @@
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import feed
+from ..models import FeedEntry, Follow, Post, User, UserStats
+
+
+class FeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.author = User.objects.create_user(username='Author')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+        cache.clear()
+
+    def follow_page(self):
+        response = self.client.get(reverse('posts:follow_index'))
+        return list(response.context['page_obj'])
+
+    def test_follow_backfills_and_unfollow_purges(self):
+        '''Подписка заполняет ленту, отписка её очищает.'''
+        old_post = Post.objects.create(text='Старый пост', author=self.author)
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.follow_page(), [old_post])
+        Follow.objects.filter(user=self.reader, author=self.author).delete()
+        self.assertFalse(FeedEntry.objects.filter(user=self.reader).exists())
+        self.assertEqual(self.follow_page(), [])
+
+    def test_new_post_fans_out(self):
+        '''Новый пост попадает в ленту подписчика.'''
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertTrue(
+            FeedEntry.objects.filter(user=self.reader, post=post).exists())
+        self.assertEqual(self.follow_page(), [post])
+
+    @override_settings(FEED_DEPTH=2)
+    def test_feed_is_trimmed(self):
+        '''Лента обрезается до FEED_DEPTH записей.'''
+        Follow.objects.create(user=self.reader, author=self.author)
+        posts = [
+            Post.objects.create(text=f'Пост {i}', author=self.author)
+            for i in range(3)
+        ]
+        self.assertEqual(
+            set(FeedEntry.objects.values_list('post_id', flat=True)),
+            {posts[1].pk, posts[2].pk},
+        )
+
+    @override_settings(FEED_DEPTH=2)
+    def test_followers_are_trimmed_in_one_query(self):
+        '''Ленты всех подписчиков обрезаются одним запросом.'''
+        readers = [self.reader] + [
+            User.objects.create_user(username=f'Reader{i}') for i in range(3)]
+        posts = [
+            Post.objects.create(text=f'Пост {i}', author=self.author)
+            for i in range(3)
+        ]
+        FeedEntry.objects.bulk_create([
+            FeedEntry(user=reader, post=post, author=self.author,
+                      pub_date=post.pub_date)
+            for reader in readers for post in posts
+        ])
+        with self.assertNumQueries(1):
+            feed.trim([reader.pk for reader in readers])
+        for reader in readers:
+            self.assertEqual(
+                set(FeedEntry.objects.filter(user=reader)
+                    .values_list('post_id', flat=True)),
+                {posts[1].pk, posts[2].pk},
+            )
+
+    @override_settings(FEED_FANOUT_LIMIT=0)
+    def test_popular_author_is_pulled_at_read(self):
+        '''Посты популярного автора не раскладываются, а читаются.'''
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Популярный пост', author=self.author)
+        self.assertFalse(FeedEntry.objects.exists())
+        self.assertEqual(self.follow_page(), [post])
+
+    @override_settings(FEED_DEPTH=2, FEED_FANOUT_LIMIT=1)
+    def test_backfill_many_in_few_queries(self):
+        '''Пачка подписок заполняет ленты одним INSERT на пачку.'''
+        readers = [self.reader] + [
+            User.objects.create_user(username=f'Reader{i}') for i in range(2)]
+        popular = User.objects.create_user(username='Popular')
+        UserStats.objects.filter(user=popular).update(followers_count=2)
+        posts = [
+            Post.objects.create(text=f'Пост {i}', author=self.author)
+            for i in range(3)
+        ]
+        Post.objects.create(text='Популярный пост', author=popular)
+        with self.assertNumQueries(3):
+            feed.backfill_many(
+                (reader.pk, author.pk)
+                for reader in readers for author in (self.author, popular)
+            )
+        for reader in readers:
+            self.assertEqual(
+                set(FeedEntry.objects.filter(user=reader)
+                    .values_list('post_id', flat=True)),
+                {posts[1].pk, posts[2].pk},
+            )
+
+    @override_settings(FEED_DEPTH=2)
+    def test_trim_keeps_short_feeds_and_breaks_ties_by_post(self):
+        '''Короткие ленты не трогаются, при равных датах старше меньший id.'''
+        other = User.objects.create_user(username='Other')
+        posts = [
+            Post.objects.create(text=f'Пост {i}', author=self.author)
+            for i in range(3)
+        ]
+        pub_date = posts[0].pub_date
+        FeedEntry.objects.bulk_create(
+            [FeedEntry(user=self.reader, post=post, author=self.author,
+                       pub_date=pub_date) for post in posts]
+            + [FeedEntry(user=other, post=posts[0], author=self.author,
+                         pub_date=pub_date)]
+        )
+        feed.trim([self.reader.pk, other.pk])
+        self.assertEqual(
+            set(FeedEntry.objects.filter(user=self.reader)
+                .values_list('post_id', flat=True)),
+            {posts[1].pk, posts[2].pk},
+        )
+        self.assertTrue(FeedEntry.objects.filter(user=other).exists())
@@ -0,0 +1,69 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core import holes
+
+from ..models import Follow, Group, Post, User
+
+
+class SharedUserPageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='Author')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.other = User.objects.create_user(username='Other')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='')
+        Post.objects.create(
+            text='Первый пост', author=cls.author, group=cls.group)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.other_client = Client()
+        self.other_client.force_login(self.other)
+        self.urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'group'}),
+            reverse('posts:profile', kwargs={'username': 'Author'}),
+            f"{reverse('posts:search')}?q=пост",
+        ]
+
+    def test_users_share_page_but_see_own_header(self):
+        '''Страница строится один раз, шапка — своя у каждого.'''
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.reader_client.get(url)
+                self.assertTemplateUsed(response, 'base.html')
+                self.assertContains(response, 'Пользователь: Reader')
+                response = self.other_client.get(url)
+                self.assertTemplateNotUsed(response, 'base.html')
+                self.assertContains(response, 'Пользователь: Other')
+                self.assertNotContains(response, 'Reader')
+                self.assertNotContains(response, '<!--hole:')
+
+    def test_follow_button_depends_on_user(self):
+        url = reverse('posts:profile', kwargs={'username': 'Author'})
+        self.assertContains(self.reader_client.get(url), 'Отписаться')
+        response = self.other_client.get(url)
+        self.assertTemplateNotUsed(response, 'base.html')
+        self.assertContains(response, 'Подписаться')
+        self.assertNotContains(response, 'Отписаться')
+
+    def test_anonymous_pages_have_no_markers(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = Client().get(url)
+                self.assertContains(response, 'Войти')
+                self.assertNotContains(response, '<!--hole:')
+
+    def test_marker_in_post_text_is_not_spliced(self):
+        '''Метку в тексте поста экранирует шаблон, её не подменить.'''
+        text = holes.marker('includes/header.html', {})
+        Post.objects.create(text=text, author=self.author)
+        response = self.reader_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Пользователь: Reader', count=1)
+        self.assertContains(response, '&lt;!--hole:')
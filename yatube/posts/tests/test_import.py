@@ -0,0 +1,104 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from .. import search
+from ..models import Comment, FeedEntry, Follow, Group, Post, User, UserStats
+
+RECORDS = [
+    {'type': 'group', 'slug': 'cats', 'title': 'Котики'},
+    {'type': 'user', 'username': 'leo', 'first_name': 'Лев'},
+    {'type': 'follow', 'user': 'reader', 'author': 'leo'},
+    {'type': 'post', 'id': 101, 'text': 'Кот спит', 'author': 'leo',
+     'group': 'cats', 'pub_date': '2020-01-01T10:00:00+00:00'},
+    {'type': 'post', 'id': 102, 'text': 'Кот ест', 'author': 'leo',
+     'pub_date': '2020-01-02T10:00:00+00:00'},
+    {'type': 'comment', 'id': 201, 'post': 101, 'author': 'reader',
+     'text': 'Мяу', 'created': '2020-01-03T10:00:00+00:00'},
+    {'type': 'comment', 'post': 999, 'author': 'reader', 'text': 'Куда?'},
+]
+
+
+class ImportTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.path = os.path.join(self.directory, 'archive.jsonl')
+        with open(self.path, 'w', encoding='utf-8') as file:
+            for record in RECORDS:
+                file.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def run_import(self, *args):
+        out = StringIO()
+        call_command('import_yatube', self.path, *args, stdout=out)
+        return out.getvalue()
+
+    def test_import_keeps_derived_data(self):
+        '''Импорт сохраняет даты и обновляет счётчики, ленты и поиск.'''
+        out = self.run_import('--batch-size=3')
+        self.assertIn('Пропущено записей: 1', out)
+
+        leo = User.objects.get(username='leo')
+        reader = User.objects.get(username='reader')
+        post = Post.objects.get(pk=101)
+        self.assertEqual(leo.first_name, 'Лев')
+        self.assertEqual(post.pub_date.year, 2020)
+        self.assertEqual(post.group, Group.objects.get(slug='cats'))
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(Comment.objects.get().created.day, 3)
+        self.assertTrue(Follow.objects.filter(user=reader, author=leo))
+
+        stats = UserStats.objects.get(user=leo)
+        self.assertEqual(stats.posts_count, 2)
+        self.assertEqual(stats.followers_count, 1)
+        self.assertEqual(Group.objects.get(slug='cats').posts_count, 1)
+        self.assertEqual(
+            set(FeedEntry.objects.filter(user=reader)
+                .values_list('post_id', flat=True)),
+            {101, 102},
+        )
+        posts, ordering = search.search('кот')
+        self.assertEqual(set(posts.values_list('pk', flat=True)), {101, 102})
+
+        # Повторный импорт ничего не дублирует.
+        self.run_import()
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertEqual(Comment.objects.count(), 1)
+
+    def test_resume_from_checkpoint(self):
+        '''С контрольной точкой импорт продолжается с нужной записи.'''
+        checkpoint = os.path.join(self.directory, 'checkpoint.json')
+        with open(checkpoint, 'w') as file:
+            json.dump({'path': self.path, 'done': 4}, file)
+        out = self.run_import('--checkpoint', checkpoint)
+        self.assertIn('Продолжаем после записи 4', out)
+        self.assertEqual(list(Post.objects.values_list('pk', flat=True)),
+                         [102])
+        self.assertFalse(Group.objects.exists())
+        self.assertFalse(os.path.exists(checkpoint))
+
+    def test_error_reports_last_written_record(self):
+        '''Ошибка называет последнюю запись, которая уже сохранена.'''
+        with open(self.path, 'a', encoding='utf-8') as file:
+            file.write('{не JSON\n')
+        with self.assertRaisesMessage(CommandError, 'После записи 6:'):
+            self.run_import('--batch-size=3')
+        self.assertEqual(Post.objects.count(), 2)
+
+    def test_csv_posts(self):
+        '''CSV без колонки type читается как посты.'''
+        path = os.path.join(self.directory, 'posts.csv')
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write('id,text,author,group\n7,Пост из CSV,anna,\n')
+        call_command('import_yatube', path, stdout=StringIO())
+        post = Post.objects.get(pk=7)
+        self.assertEqual(post.author.username, 'anna')
+        self.assertIsNone(post.group)
@@ -1,9 +1,14 @@
 from audioop import reverse
 
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
+from .. import counters
 from ..models import Group, Post, User
+from ..pagination import MAX_SKIP
 
 
 class PaginatorViewsTest(TestCase):
@@ -27,6 +32,9 @@ class PaginatorViewsTest(TestCase):
             ) for i in range(13)
         ]
 
+    def setUp(self):
+        cache.clear()
+
     def test_first_page_contains_ten_records(self):
         '''Проверка вывода 10 постов. Корректная работа paginatora'''
         test_list = [
@@ -52,3 +60,113 @@ class PaginatorViewsTest(TestCase):
             with self.subTest(response=response):
                 response = self.client.get(response + '?page=2')
                 self.assertEqual(len(response.context['page_obj']), 3)
+
+    def test_cursor_navigation(self):
+        '''Переход по курсорам вперёд и назад без подсчёта записей.'''
+        url = reverse('posts:index')
+        # Итог постов считается один раз и дальше живёт в кеше.
+        counters.total_posts()
+        with CaptureQueriesContext(connection) as queries:
+            first_page = self.client.get(url).context['page_obj']
+        self.assertFalse(
+            any('COUNT(' in query['sql'] for query in queries.captured_queries)
+        )
+        self.assertTrue(first_page.has_next())
+        self.assertFalse(first_page.has_previous())
+
+        second_page = self.client.get(
+            url, {'cursor': first_page.next_cursor}).context['page_obj']
+        self.assertEqual(len(second_page), 3)
+        self.assertEqual(second_page.number, 2)
+        self.assertFalse(second_page.has_next())
+        self.assertEqual(
+            set(first_page) & set(second_page), set()
+        )
+
+        back_page = self.client.get(
+            url, {'cursor': second_page.previous_cursor}).context['page_obj']
+        self.assertEqual(list(back_page), list(first_page))
+        self.assertFalse(back_page.has_previous())
+
+    def test_broken_cursor_returns_first_page(self):
+        '''Испорченный курсор открывает первую страницу.'''
+        response = self.client.get(
+            reverse('posts:index'), {'cursor': 'broken'})
+        self.assertEqual(len(response.context['page_obj']), 10)
+
+
+class PageWindowTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='Writer')
+        for i in range(95):
+            Post.objects.create(text=f'Пост {i}', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        # Счётчик, который поддерживают сигналы.
+        cache.set(counters.TOTAL_POSTS_KEY, Post.objects.count(), None)
+
+    def page(self, query=''):
+        response = self.client.get(f"{reverse('posts:index')}?{query}")
+        return response.context['page_obj']
+
+    def test_window_around_current_page(self):
+        '''Первая, последняя и по две соседние страницы.'''
+        first = self.page()
+        self.assertEqual(
+            [number for number, query in first.page_window()],
+            [1, 2, 3, None, 10],
+        )
+        third_query = first.page_window()[2][1]
+        self.assertIn('skip=1', third_query)
+        third = self.page(third_query)
+        self.assertEqual(third.number, 3)
+        self.assertEqual(third[0].text, 'Пост 74')
+        window = third.page_window()
+        self.assertEqual(
+            [number for number, query in window], [1, 2, 3, 4, 5, None, 10])
+        self.assertEqual(window[0][1], '')
+        self.assertIsNone(window[2][1])
+        self.assertEqual(list(self.page(window[1][1])), list(self.page(
+            first.page_window()[1][1])))
+
+    def test_last_page(self):
+        '''Последняя страница читается с конца и не пересекается с 9-й.'''
+        last = self.page(self.page().page_window()[-1][1])
+        self.assertEqual(last.number, 10)
+        self.assertEqual([post.text for post in last],
+                         [f'Пост {i}' for i in range(4, -1, -1)])
+        self.assertFalse(last.has_next())
+        ninth = self.page(f'cursor={last.previous_cursor}')
+        self.assertEqual(ninth.number, 9)
+        self.assertEqual(ninth[len(ninth) - 1].text, 'Пост 5')
+
+    def test_total_is_maintained_without_count(self):
+        '''Итог берётся из кеша и сдвигается при создании и удалении.'''
+        with self.assertNumQueries(0):
+            self.assertEqual(counters.total_posts(), 95)
+        post = Post.objects.create(text='Ещё', author=self.user)
+        self.assertEqual(counters.total_posts(), 96)
+        post.delete()
+        self.assertEqual(counters.total_posts(), 95)
+
+    def test_total_ignores_deleted_rows(self):
+        '''Удалённые посты не завышают итог и размер последней страницы.'''
+        Post.objects.filter(text__in=['Пост 1', 'Пост 2']).delete()
+        cache.clear()
+        self.assertEqual(counters.total_posts(), 93)
+        last = self.page(self.page().page_window()[-1][1])
+        self.assertEqual([post.text for post in last],
+                         ['Пост 4', 'Пост 3', 'Пост 0'])
+
+    def test_large_skip_opens_first_page(self):
+        cursor = self.page().next_cursor
+        page = self.page(f'cursor={cursor}&skip={MAX_SKIP + 1}')
+        self.assertEqual(page.number, 1)
+
+    def test_large_page_number_opens_first_page(self):
+        '''Номер страницы без курсора не даёт OFFSET больше MAX_SKIP.'''
+        self.assertEqual(self.page(f'page={MAX_SKIP}').number, MAX_SKIP)
+        self.assertEqual(self.page(f'page={MAX_SKIP + 2}').number, 1)
+        self.assertEqual(self.page('page=100000000').number, 1)
@@ -0,0 +1,68 @@
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from core.decorators import query_budget
+from core.testing import QueryBudgetMixin
+
+from ..models import Comment, Follow, Group, Post, User
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Reader')
+        cls.author = User.objects.create_user(username='Author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        Follow.objects.create(user=cls.user, author=cls.author)
+        # Разные авторы и группы: N+1 проявился бы числом запросов.
+        for i in range(10):
+            author = User.objects.create_user(username=f'Author{i}')
+            group = Group.objects.create(
+                title=f'Группа {i}', slug=f'group-{i}', description='')
+            Follow.objects.create(user=cls.user, author=author)
+            Post.objects.create(text=f'Пост {i}', author=author, group=group)
+            Post.objects.create(
+                text=f'Пост группы {i}', author=cls.author, group=cls.group)
+        cls.post = Post.objects.filter(author=cls.author).first()
+        for i in range(5):
+            commenter = User.objects.create_user(username=f'Commenter{i}')
+            Comment.objects.create(
+                post=cls.post, author=commenter, text=f'Комментарий {i}')
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        cache.clear()
+
+    def test_read_views_fit_budget(self):
+        '''Страницы лент укладываются в объявленный бюджет запросов.'''
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': 'Author'}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+            reverse('posts:follow_index'),
+            reverse('posts:post_create'),
+            reverse('posts:post_edit', kwargs={'post_id': self.post.pk}),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                cache.clear()
+                self.assertQueryBudget(self.authorized_client, url)
+
+    def test_debug_warns_over_budget(self):
+        '''В режиме DEBUG превышение бюджета попадает в лог.'''
+        @query_budget(0)
+        def view(request):
+            list(Post.objects.all())
+            return HttpResponse()
+
+        request = RequestFactory().get('/')
+        with override_settings(DEBUG=True):
+            with self.assertLogs('core.decorators', 'WARNING'):
+                view(request)
@@ -0,0 +1,82 @@
+import re
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User
+
+# Полный просмотр таблицы или сортировка во временном B-дереве.
+BAD_PLAN = re.compile(r'^SCAN \S+$|TEMP B-TREE')
+
+
+class QueryPlanTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Reader')
+        cls.author = User.objects.create_user(username='Author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        Follow.objects.create(user=cls.user, author=cls.author)
+        for i in range(25):
+            Post.objects.create(
+                text=f'Пост {i}', author=cls.author, group=cls.group)
+        cls.post = Post.objects.first()
+        for i in range(25):
+            Comment.objects.create(
+                post=cls.post, author=cls.user, text=f'Комментарий {i}')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def main_query(self, url, table):
+        """Запрос страницы к таблице ленты (с LIMIT пагинатора)."""
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        queries = [
+            query['sql'] for query in context.captured_queries
+            if f'FROM "{table}"' in query['sql'] and 'LIMIT' in query['sql']
+        ]
+        self.assertEqual(len(queries), 1, queries)
+        return queries[0]
+
+    def plan(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def test_feeds_use_indexes(self):
+        '''Основные запросы лент идут по индексам, без сортировки.'''
+        group_url = reverse('posts:group_list', kwargs={'slug': 'group'})
+        profile_url = reverse('posts:profile', kwargs={'username': 'Author'})
+        index_url = reverse('posts:index')
+        cursor = self.client.get(index_url).context['page_obj'].next_cursor
+        pages = [
+            (index_url, 'posts_post'),
+            (f'{index_url}?cursor={cursor}', 'posts_post'),
+            (group_url, 'posts_post'),
+            (profile_url, 'posts_post'),
+            (reverse('posts:follow_index'), 'posts_feedentry'),
+            (reverse('posts:post_detail', args=[self.post.pk]),
+             'posts_comment'),
+        ]
+        for url, table in pages:
+            with self.subTest(url=url):
+                cache.clear()
+                plan = self.plan(self.main_query(url, table))
+                self.assertFalse(
+                    [step for step in plan if BAD_PLAN.search(step)], plan)
+
+    def test_follow_lookup_uses_unique_index(self):
+        '''Проверка подписки идёт по уникальному индексу.'''
+        queryset = Follow.objects.filter(user=self.user, author=self.author)
+        plan = self.plan(str(queryset.query))
+        self.assertTrue(
+            any('unique_follow' in step or 'autoindex' in step
+                for step in plan), plan)
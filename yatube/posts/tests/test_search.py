@@ -0,0 +1,102 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import search
+from ..models import Group, Post, User
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Searcher')
+        cls.group = Group.objects.create(
+            title='Котики', slug='cats', description='Описание')
+        cls.cat_post = Post.objects.create(
+            text='Кот спит на окне', author=cls.author)
+        cls.dog_post = Post.objects.create(
+            text='Собака гуляет во дворе', author=cls.author)
+        cls.group_post = Post.objects.create(
+            text='Фотография дня', author=cls.author, group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+
+    def found(self, query):
+        posts, ordering = search.search(query)
+        return set(posts.values_list('pk', flat=True))
+
+    def test_index_follows_changes(self):
+        '''Индекс обновляется при правке и удалении постов и групп.'''
+        self.assertEqual(self.found('спит'), {self.cat_post.pk})
+        self.assertEqual(self.found('котик'), {self.group_post.pk})
+        self.assertEqual(self.found('СОБАК'), {self.dog_post.pk})
+        self.assertEqual(self.found('OR "'), set())
+
+        self.dog_post.text = 'Собака тоже спит'
+        self.dog_post.save()
+        self.assertEqual(
+            self.found('спит'), {self.cat_post.pk, self.dog_post.pk})
+
+        self.group.title = 'Пейзажи'
+        self.group.save()
+        self.assertEqual(self.found('пейзаж'), {self.group_post.pk})
+
+        Post.objects.get(pk=self.cat_post.pk).delete()
+        self.assertEqual(self.found('окне'), set())
+
+    def test_search_page_is_paginated_by_rank(self):
+        '''Страница поиска листается курсором и сохраняет запрос.'''
+        for i in range(12):
+            Post.objects.create(
+                text=f'Поиск {"поиск " * i}{i}', author=self.author)
+        client = Client()
+        url = reverse('posts:search')
+        response = client.get(url, {'q': 'поиск'})
+        first = response.context['page_obj']
+        self.assertEqual(len(first), 10)
+        self.assertContains(response, 'q=%D0%BF%D0%BE%D0%B8%D1%81%D0%BA&')
+        ranks = [post.rank for post in first]
+        self.assertEqual(ranks, sorted(ranks))
+
+        response = client.get(
+            url, {'q': 'поиск', 'cursor': first.next_cursor})
+        second = response.context['page_obj']
+        self.assertEqual(len(second), 2)
+        self.assertFalse(
+            {post.pk for post in first} & {post.pk for post in second})
+
+    def test_search_scans_index_once(self):
+        '''Ранг считается при одном обходе индекса, и на страницах курсора.'''
+        for i in range(12):
+            Post.objects.create(text=f'Поиск {i}', author=self.author)
+        url = reverse('posts:search')
+        cursor = Client().get(url, {'q': 'поиск'}).context[
+            'page_obj'].next_cursor
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            Client().get(url, {'q': 'поиск', 'cursor': cursor})
+        sql, = [query['sql'] for query in context.captured_queries
+                if 'MATCH' in query['sql']]
+        self.assertEqual(sql.count('MATCH'), 1, sql)
+        with connection.cursor() as db:
+            db.execute('EXPLAIN QUERY PLAN ' + sql)
+            plan = [row[-1] for row in db.fetchall()]
+        self.assertFalse(
+            [step for step in plan if 'CORRELATED' in step], plan)
+
+    def test_rebuild_command(self):
+        '''Команда восстанавливает индекс после потери строк.'''
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {search.TABLE}')
+        self.assertEqual(self.found('спит'), set())
+        out = StringIO()
+        call_command('rebuild_search_index', '--chunk-size=2', stdout=out)
+        self.assertIn('3', out.getvalue())
+        self.assertEqual(self.found('спит'), {self.cat_post.pk})
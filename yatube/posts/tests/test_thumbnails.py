@@ -0,0 +1,109 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import thumbnails
+from ..models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Painter')
+        cls.post = Post.objects.create(
+            text='Пост с картинкой',
+            author=cls.user,
+            image=SimpleUploadedFile(
+                'thumb.gif', SMALL_GIF, content_type='image/gif'),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_placeholder_until_generated(self):
+        '''Пока миниатюры нет, вместо неё выводится заглушка.'''
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'bg-light')
+        self.assertIsNone(thumbnails.cached_thumbnail(self.post.image))
+
+        thumbnails.generate(self.post.image.name)
+        thumbnail = thumbnails.cached_thumbnail(self.post.image)
+        self.assertIsNotNone(thumbnail)
+        # Страница с заглушкой сброшена из кеша после генерации.
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, thumbnail.url)
+
+    def test_cached_pages_get_thumbnail_after_generation(self):
+        '''Закешированные страницы с заглушкой перестраиваются.'''
+        self.client.force_login(self.user)
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:profile', kwargs={'username': 'Painter'}),
+        ]
+        for url in urls:
+            self.client.get(url)
+            self.assertContains(self.client.get(url), 'bg-light')
+        thumbnails.generate(self.post.image.name)
+        thumbnail = thumbnails.cached_thumbnail(self.post.image)
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertContains(response, thumbnail.url)
+                self.assertNotContains(response, 'bg-light')
+
+    def test_pregenerate_command(self):
+        '''Команда создаёт миниатюры для уже загруженных картинок.'''
+        out = StringIO()
+        call_command('pregenerate_thumbnails', '--workers=1', stdout=out)
+        self.assertIn('Обработано картинок: 1,', out.getvalue())
+        self.assertIsNotNone(thumbnails.cached_thumbnail(self.post.image))
+
+    def test_resolve_page_in_one_query(self):
+        '''Миниатюры страницы ищутся одним запросом, а затем из кеша.'''
+        posts = [self.post] + [
+            Post.objects.create(
+                text=f'Пост {i}', author=self.user,
+                image=SimpleUploadedFile(
+                    f'thumb{i}.gif', SMALL_GIF, content_type='image/gif'),
+            )
+            for i in range(3)
+        ]
+        for post in posts[:-1]:
+            thumbnails.generate(post.image.name)
+        cache.clear()
+
+        with self.assertNumQueries(1):
+            thumbnails.resolve(posts)
+        for post in posts[:-1]:
+            self.assertEqual(post.thumbnail.width, 960)
+        self.assertIsNone(posts[-1].thumbnail)
+        self.assertTrue(posts[-1].thumbnail_pending)
+
+        with self.assertNumQueries(0):
+            thumbnails.resolve(posts[:-1])
@@ -9,6 +9,7 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
+from ..cache import bump, card_key
 from ..models import Group, Post, User
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -184,7 +185,8 @@ class PostsViewsTests(TestCase):
         )
         response_before = self.authorized_client.get(
             reverse('posts:index')).content
-        test_cache.delete()
+        # Изменение в обход сигналов версию страницы не меняет.
+        Post.objects.filter(pk=test_cache.pk).update(text='Другой текст')
         response_after = self.authorized_client.get(
             reverse('posts:index')).content
         self.assertEqual(response_before, response_after)
@@ -193,6 +195,55 @@ class PostsViewsTests(TestCase):
             reverse('posts:index')).content
         self.assertNotEqual(response_before, response_after)
 
+    def test_cache_invalidation(self):
+        '''Изменение поста сразу сбрасывает кеш его страниц.'''
+        test_cache = Post.objects.create(
+            text='Тест сброса кеша',
+            author=self.user,
+            group=self.group,
+        )
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test_slug'}),
+            reverse('posts:profile', kwargs={'username': 'TestUser'}),
+        ]
+        for url in urls:
+            self.assertContains(
+                self.guest_client.get(url), 'Тест сброса кеша')
+        test_cache.delete()
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertNotContains(
+                    self.guest_client.get(url), 'Тест сброса кеша')
+
+    def test_author_name_change_resets_feeds(self):
+        '''Новое имя автора сразу видно на главной и в группе.'''
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test_slug'}),
+        ]
+        for url in urls:
+            self.guest_client.get(url)
+        author = User.objects.get(pk=self.user.pk)
+        author.first_name, author.last_name = 'Лев', 'Толстой'
+        author.save()
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(self.guest_client.get(url), 'Лев Толстой')
+
+    def test_post_cards_from_cache(self):
+        '''Карточки постов берутся из общего кеша карточек.'''
+        template_name = 'posts/includes/post_list.html'
+        self.guest_client.get(reverse('posts:index'))
+        post = Post.objects.for_feed().get(pk=self.post_1.pk)
+        key = card_key(post, template_name)
+        self.assertIn('Тестовый текст 1', cache.get(key))
+        cache.set(key, 'Карточка из кеша')
+        bump('index')
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Карточка из кеша')
+        self.assertNotContains(response, 'Тестовый текст 1<')
+
     def test_user_signature(self):
         '''Проверяем добавление и удаление подписок.'''
         followers_count = self.user.follower.count()
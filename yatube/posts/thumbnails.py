@@ -0,0 +1,166 @@
+"""Заранее генерируемые миниатюры картинок постов.
+
+Миниатюры создаются не в запросе первого зрителя, а в небольшом пуле
+потоков сразу после сохранения картинки. Пока миниатюры нет, шаблон
+показывает заглушку.
+"""
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from threading import BoundedSemaphore, Lock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore
+
+from . import cache as page_cache
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+# Размеры, которые выводят шаблоны: (геометрия, опции sorl-thumbnail).
+POST_IMAGE = ('960x339', {'crop': 'center', 'upscale': True})
+SIZES = (POST_IMAGE,)
+
+LOCK_KEY = 'thumbnail-lock:{}'
+LOCK_TIMEOUT = 60
+
+_executor = None
+_slots = None
+_executor_lock = Lock()
+
+
+def _get_executor():
+    """Пул потоков и семафор, ограничивающий длину его очереди."""
+    global _executor, _slots
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails',
+            )
+            _slots = BoundedSemaphore(settings.THUMBNAIL_QUEUE_SIZE)
+        return _executor, _slots
+
+
+def thumbnail_file(image, geometry, options):
+    """Файл миниатюры, который создал бы ``get_thumbnail``, без генерации."""
+    source = ImageFile(image)
+    backend = default.backend
+    options = dict(options)
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    name = backend._get_thumbnail_filename(source, geometry, options)
+    return ImageFile(name, default.storage)
+
+
+def cached_thumbnail(image, geometry=POST_IMAGE[0], options=POST_IMAGE[1]):
+    """Готовая миниатюра из хранилища sorl или ``None``."""
+    return default.kvstore.get(thumbnail_file(image, geometry, options))
+
+
+def _lookup(keys):
+    """Значения ключей sorl: один ``get_many`` к кешу, промахи — из БД.
+
+    Так же, как ``cached_db_kvstore``, найденное в БД кладётся в кеш.
+    Отсутствующие ключи не кешируются: миниатюра вот-вот появится.
+    """
+    kv_cache = default.kvstore.cache
+    values = kv_cache.get_many(keys)
+    missing = [key for key in keys if not values.get(key)]
+    if missing:
+        found = dict(
+            KVStore.objects.filter(key__in=missing)
+            .values_list('key', 'value')
+        )
+        if found:
+            kv_cache.set_many(found, sorl_settings.THUMBNAIL_CACHE_TIMEOUT)
+            values.update(found)
+    return values
+
+
+def resolve(posts, geometry=POST_IMAGE[0], options=POST_IMAGE[1]):
+    """Найти миниатюры всех постов страницы разом.
+
+    Каждому посту с картинкой проставляется ``thumbnail`` (``ImageFile``
+    с адресом и размерами или ``None``); для недостающих миниатюр
+    ставится генерация, а пост помечается ``thumbnail_pending``.
+    """
+    posts = [post for post in posts if post.image]
+    keys = [
+        add_prefix(thumbnail_file(post.image, geometry, options).key)
+        for post in posts
+    ]
+    values = _lookup(list(set(keys))) if keys else {}
+    for post, key in zip(posts, keys):
+        value = values.get(key)
+        post.thumbnail = deserialize_image_file(value) if value else None
+        if post.thumbnail is None:
+            post.thumbnail_pending = True
+            schedule(post.image)
+
+
+def generate(name):
+    """Создать все миниатюры картинки; возвращает успех.
+
+    Страницы с постами этой картинки закешированы с заглушкой, поэтому
+    после генерации их области сбрасываются.
+    """
+    try:
+        for geometry, options in SIZES:
+            get_thumbnail(name, geometry, **options)
+    except Exception:
+        logger.exception('Не удалось создать миниатюры для %s', name)
+        return False
+    posts = Post.objects.filter(image=name).select_related('author', 'group')
+    for post in posts:
+        page_cache.bump(*page_cache.post_scopes(post))
+    return True
+
+
+def _job(name):
+    try:
+        generate(name)
+    finally:
+        cache.delete(_lock_key(name))
+        close_old_connections()
+        _get_executor()[1].release()
+
+
+def schedule(image):
+    """Поставить генерацию миниатюр в очередь после коммита транзакции.
+
+    Один и тот же файл одновременно генерируется не больше одного раза,
+    даже если его запросили несколько процессов. Если очередь полна,
+    задача отбрасывается: её снова поставит следующий показ заглушки.
+    """
+    if not image:
+        return
+    name = image.name
+
+    def submit():
+        executor, slots = _get_executor()
+        if not slots.acquire(blocking=False):
+            return
+        if cache.add(_lock_key(name), True, LOCK_TIMEOUT):
+            executor.submit(_job, name)
+        else:
+            slots.release()
+
+    transaction.on_commit(submit)
+
+
+def _lock_key(name):
+    return LOCK_KEY.format(hashlib.md5(name.encode()).hexdigest())
@@ -1,30 +1,44 @@
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
-from django.http import HttpResponseRedirect
+from django.core.paginator import InvalidPage
+from django.http import (Http404, HttpResponseRedirect,
+                         StreamingHttpResponse)
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
-from django.views.decorators.cache import cache_page
+from django.utils.http import urlencode
 
+from core.decorators import query_budget
+
+from . import counters, exporter, feed, search, thumbnails
+from .cache import versioned_cache_page
+from .conditional import (POST_PAGE_SCOPES, conditional_page,
+                          post_scopes_lookup)
 from .forms import CommentForm, PostForm
-from .models import Group, Post, User, Follow
+from .models import Comment, Group, Post, User, Follow
+from .pagination import CursorPaginator
 
 NUMBER_DISPLAYED_OBJECTS = 10
+COMMENTS_PER_PAGE = 20
 
 
-@cache_page(20, key_prefix='index_page')
+@versioned_cache_page('index', holes=True)
+@query_budget(4)
 def index(request):
-    post = Post.objects.all()
-    page_obj = paginator(post, request)
+    post = Post.objects.for_feed()
+    page_obj = paginator(post, request, count=counters.total_posts())
     context = {
         'page_obj': page_obj,
     }
     return render(request, 'posts/index.html', context)
 
 
+@conditional_page('group:{slug}')
+@versioned_cache_page('group:{slug}', holes=True)
+@query_budget(4)
 def group_posts_list(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
-    page_obj = paginator(posts, request)
+    posts = group.posts.for_feed()
+    page_obj = paginator(posts, request, count=group.posts_count)
 
     context = {
         'group': group,
@@ -33,44 +47,75 @@ def group_posts_list(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@conditional_page('author:{username}')
+@versioned_cache_page('author:{username}', holes=True)
+@query_budget(5)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts_count = author.posts.count()
-    posts = Post.objects.filter(author__username=username)
-    page_obj = paginator(posts, request)
-    is_follower = Follow.objects.filter(
-        user=request.user,
-        author=get_object_or_404(User, username=username)
-    ).exists() if request.user.is_authenticated else False
-    if is_follower:
-        following = True
-    else:
-        following = False
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username)
+    stats = counters.user_stats(author)
+    posts = author.posts.for_feed()
+    page_obj = paginator(posts, request, count=stats.posts_count)
     context = {
         'author': author,
-        'post_list': posts_count,
+        'post_list': stats.posts_count,
+        'stats': stats,
         'page_obj': page_obj,
-        'following': following,
     }
     return render(request, 'posts/profile.html', context)
 
 
+@conditional_page(*POST_PAGE_SCOPES, lookup=post_scopes_lookup)
+@versioned_cache_page(
+    *POST_PAGE_SCOPES, lookup=post_scopes_lookup, authenticated=False)
+@query_budget(5)
 def post_detail(request, post_id):
     '''Выводим один конкретный пост.'''
-    post = get_object_or_404(Post, pk=post_id)
-    count_posts = post.author.posts.count()
-    comments = post.comments.all()
+    post = get_object_or_404(Post.objects.for_detail(), pk=post_id)
+    count_posts = counters.user_stats(post.author).posts_count
     form = CommentForm(request.POST or None)
     context = {
         'post': post,
         'count_posts': count_posts,
         'form': form,
-        'comments': comments,
+        'comments': comments_page(post.pk),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def comments_page(post_id, cursor=None):
+    '''Страница комментариев поста вместе с авторами, по курсору.'''
+    comments = Comment.objects.filter(post_id=post_id).select_related(
+        'author').only('text', 'created', 'post_id', 'author__username')
+    return CursorPaginator(
+        comments, COMMENTS_PER_PAGE, ordering=('created', 'id'),
+    ).page(cursor=cursor)
+
+
+@conditional_page('post:{post_id}')
+@query_budget(2)
+def post_comments(request, post_id):
+    '''Следующие страницы комментариев: фрагмент для подгрузки.
+
+    Есть комментарии — есть и пост; проверяем его, только если их нет.
+    Испорченный курсор — 404, а не первая страница: её комментарии
+    подгрузились бы повторно.
+    '''
+    try:
+        comments = comments_page(post_id, request.GET.get('cursor'))
+    except InvalidPage:
+        raise Http404('Некорректный курсор')
+    if not comments and not Post.objects.filter(pk=post_id).exists():
+        raise Http404('Пост не найден')
+    context = {
+        'post_id': post_id,
+        'comments': comments,
+    }
+    return render(request, 'posts/includes/comments.html', context)
+
+
 @login_required
+@query_budget(3)
 def post_create(request):
     form = PostForm(
         request.POST or None,
@@ -80,6 +125,7 @@ def post_create(request):
         post = form.save(commit=False)
         post.author = request.user
         form.save()
+        thumbnails.schedule(post.image)
         return redirect('posts:profile', request.user.username)
 
     form = PostForm()
@@ -90,6 +136,7 @@ def post_create(request):
 
 
 @login_required
+@query_budget(4)
 def post_edit(request, post_id):
     editable_post = get_object_or_404(Post, pk=post_id)
     if request.user != editable_post.author:
@@ -102,7 +149,9 @@ def post_edit(request, post_id):
         instance=editable_post,
     )
     if form.is_valid():
-        form.save()
+        post = form.save()
+        if 'image' in form.changed_data:
+            thumbnails.schedule(post.image)
         return HttpResponseRedirect(
             reverse('posts:post_detail', args=[post_id]))
     form = PostForm(instance=editable_post)
@@ -113,14 +162,33 @@ def post_edit(request, post_id):
     return render(request, 'posts/create_post.html', contex)
 
 
-def paginator(post, request):
-    paginator_object = Paginator(post, NUMBER_DISPLAYED_OBJECTS)
-    page_number = request.GET.get('page')
-    page_obj = paginator_object.get_page(page_number)
+def paginator(post, request, **options):
+    paginator_object = CursorPaginator(
+        post, NUMBER_DISPLAYED_OBJECTS, **options)
+    page_obj = paginator_object.get_page(
+        cursor=request.GET.get('cursor'),
+        number=request.GET.get('page'),
+        skip=request.GET.get('skip'),
+    )
     return page_obj
 
 
+@versioned_cache_page('index', holes=True)
+@query_budget(3)
+def post_search(request):
+    query = request.GET.get('q', '').strip()
+    posts, ordering = search.search(query)
+    page_obj = paginator(posts, request, ordering=ordering)
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+        'extra_query': urlencode({'q': query}) + '&',
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
+@query_budget(4)
 def add_comment(request, post_id):
     form = CommentForm(request.POST or None)
     if form.is_valid():
@@ -132,10 +200,11 @@ def add_comment(request, post_id):
 
 
 @login_required
+@query_budget(4)
 def follow_index(request):
     '''Страница авторов, на которые подписан пользователь.'''
-    post = Post.objects.filter(author__following__user=request.user)
-    page_obj = paginator(post, request)
+    post, options = feed.followed_posts(request.user)
+    page_obj = paginator(post, request, **options)
     context = {
         'page_obj': page_obj,
     }
@@ -143,17 +212,20 @@ def follow_index(request):
 
 
 @login_required
+@query_budget(8)
 def profile_follow(request, username):
     '''Подписаться на автора.'''
     user = request.user
-    author = User.objects.get(username=username)
-    is_follower = Follow.objects.filter(user=user, author=author)
-    if user != author and not is_follower:
-        Follow.objects.create(user=user, author=author)
+    author = get_object_or_404(User, username=username)
+    if user != author:
+        # Уникальный индекс (user, author) защищает от повторной подписки
+        # при одновременных запросах; get_or_create переживает гонку.
+        Follow.objects.get_or_create(user=user, author=author)
     return HttpResponseRedirect(reverse('posts:profile', args=[username]))
 
 
 @login_required
+@query_budget(8)
 def profile_unfollow(request, username):
     '''Отписка от автора.'''
     author = get_object_or_404(User, username=username)
@@ -162,3 +234,25 @@ def profile_unfollow(request, username):
         is_follower.delete()
     return HttpResponseRedirect(reverse(
         'posts:profile', kwargs={'username': author}))
+
+
+@staff_member_required
+def export_posts(request):
+    '''Выгрузка постов автора или группы потоком, без загрузки в память.'''
+    export_format = request.GET.get('format', 'jsonl')
+    if export_format not in exporter.FORMATS:
+        raise Http404('Неизвестный формат выгрузки')
+    compress = request.GET.get('gzip') == '1'
+    queryset = exporter.posts_queryset(
+        author=request.GET.get('author'), group=request.GET.get('group'))
+    filename = f'posts.{export_format}'
+    if compress:
+        filename += '.gz'
+    response = StreamingHttpResponse(
+        exporter.export(queryset, export_format, compress),
+        content_type=(
+            'application/gzip' if compress
+            else exporter.FORMATS[export_format]),
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -25,15 +25,20 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
+    'benchmarks.apps.BenchmarksConfig',
     'sorl.thumbnail',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.ReplicaStickinessMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.CachedAuthenticationMiddleware',
+    'core.middleware.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -43,7 +48,7 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template_backends.TimedDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -67,6 +72,26 @@ DATABASES = {
     }
 }
 
+# Реплики только для чтения. Локально это копии db.sqlite3, которые
+# обновляет ``manage.py sync_replicas --lag N``: YATUBE_REPLICAS=2
+# заводит replica1 и replica2. В тестах реплики — зеркала default.
+DATABASE_REPLICAS = []
+for number in range(1, int(os.environ.get('YATUBE_REPLICAS', 0)) + 1):
+    DATABASE_REPLICAS.append(f'replica{number}')
+    DATABASES[f'replica{number}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, f'db.replica{number}.sqlite3'),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['core.db_router.PrimaryReplicaRouter']
+
+# Наибольшее допустимое отставание реплик в секундах и сколько секунд
+# после записи пользователь читает из основной базы: с запасом больше
+# отставания, чтобы он не увидел страницу без своих изменений.
+REPLICA_MAX_LAG = 2
+REPLICA_STICKY_SECONDS = 5 * REPLICA_MAX_LAG
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -96,6 +121,11 @@ STATIC_URL = '/static/'
 
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 
+# collectstatic добавляет к именам хеш содержимого и кладёт рядом копии
+# .gz и .br (если установлен brotli); {% static %} выводит имена с хешем.
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+STATICFILES_STORAGE = 'core.storage.CompressedManifestStaticFilesStorage'
+
 LOGIN_URL = 'users:login'
 
 LOGIN_REDIRECT_URL = 'posts:index'
@@ -114,8 +144,84 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# default — короткоживущий L1 в памяти процесса перед общим кешем 'shared'.
+# Локально 'shared' хранится в файлах, в бою это Redis или memcached.
+# Мимо L1 читаются ключи, которые меняются на месте: версии областей,
+# копии страниц для анонимов (версии хранятся в самой копии) и число
+# постов для пагинатора.
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        'BACKEND': 'core.cache.TwoTierCache',
+        'LOCATION': 'shared',
+        'OPTIONS': {
+            'L1_MAX_ENTRIES': 1000,
+            'L1_TIMEOUT': 5,
+            'L1_BYPASS_PREFIXES': [
+                'scope-version:', 'anon-page:', 'listing-total:',
+            ],
+        },
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, '.django_cache'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
 }
+
+# Тесты не трогают кеш и блокировки запущенного локально сервера.
+TEST_RUNNER = 'core.testing.TestRunner'
+
+# Межпроцессные блокировки (core.locks) берутся в общем кеше; для
+# файлового кеша — файлами в LOCKS_DIR, общем для всех воркеров.
+LOCKS_CACHE = 'shared'
+LOCKS_DIR = os.path.join(BASE_DIR, '.locks')
+
+# Страницы с версиями областей сбрасываются при изменениях; таймаут лишь
+# страхует от правок, которые версии не затрагивают.
+PAGE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Страницы для анонимов: срок свежести копии и его случайный разброс,
+# сколько ещё отдавать устаревшую копию, пока её перестраивает один
+# запрос, срок блокировки перестройки и сколько ждать копию, если её нет.
+ANON_PAGE_TTL = 60
+ANON_PAGE_JITTER = 0.2
+ANON_PAGE_STALE_TTL = 60 * 60 * 24
+ANON_PAGE_LOCK_TIMEOUT = 30
+ANON_PAGE_WAIT = 0.5
+
+# Карточки постов адресуются по содержимому и не требуют сброса.
+CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Лента подписок: сколько записей хранить на подписчика и сколько
+# подписчиков может быть у автора, чтобы его посты раскладывались по лентам.
+FEED_DEPTH = 500
+FEED_FANOUT_LIMIT = 1000
+
+# Миниатюры картинок постов создаются в пуле потоков после загрузки.
+THUMBNAIL_WORKERS = 2
+THUMBNAIL_QUEUE_SIZE = 100
+
+# Метрики Prometheus: каталог снимков процессов (None — без сложения
+# процессов), период записи снимка и адреса, которым доступен /metrics
+# (пустой список — всем).
+METRICS_DIR = os.path.join(BASE_DIR, '.metrics')
+METRICS_FLUSH_INTERVAL = 5
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+
+# Профилирование запросов: куда писать профили, сколько хранить, сколько
+# живёт токен сотрудника и какой доле запросов профилироваться случайно
+# (один из N; 0 — только по токену).
+PROFILING_DIR = os.path.join(BASE_DIR, '.profiles')
+PROFILING_MAX_FILES = 50
+PROFILING_TOKEN_AGE = 60 * 60
+PROFILING_SAMPLE_RATE = 0
+
+# Сессии и снимки пользователей читаются из общего кеша, а не из базы;
+# сессии при этом пишутся и в базу. L1 здесь не годится: выход из
+# системы должен сразу действовать во всех процессах.
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+SESSION_CACHE_ALIAS = 'shared'
+USER_SNAPSHOT_CACHE_ALIAS = 'shared'
+USER_SNAPSHOT_TIMEOUT = 60 * 60
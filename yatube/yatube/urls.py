@@ -1,14 +1,24 @@
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import include, path
+from django.urls import include, path, re_path
+
+from core.views import metrics_view, serve_static
 
 urlpatterns = [
     path('', include('posts.urls', namespace='posts')),
+    path('admin/profiles/', include('core.urls', namespace='core')),
     path('admin/', admin.site.urls),
     path('auth/', include('users.urls')),
     path('auth/', include('django.contrib.auth.urls')),
     path('about/', include('about.urls', namespace='about')),
+    path('api/', include('api.urls', namespace='api')),
+    path('metrics', metrics_view, name='metrics'),
+    re_path(
+        r'^%s(?P<path>.+)$' % settings.STATIC_URL.lstrip('/'),
+        serve_static,
+        name='static'
+    ),
 ]
 
 handler404 = 'core.views.page_not_found'